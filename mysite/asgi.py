@@ -2,6 +2,7 @@
 ASGI config for mysite project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Live results streaming (``polls:results_stream``) needs this entry point.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
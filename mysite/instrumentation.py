@@ -0,0 +1,214 @@
+"""
+Per-request instrumentation.
+
+RequestMetricsMiddleware records, for every request, the number of SQL
+queries and the time spent in them (through an execute wrapper installed
+on every connection, which finds the metrics of the request being
+handled in a context variable, so async requests sharing the thread that
+runs their queries are told apart),
+the time spent rendering a TemplateResponse and the cache hits and misses
+reported with record_cache_access(). The figures are sent back in a
+Server-Timing header and logged to 'mysite.instrumentation' as one
+key=value line per request (also attached to the record as 'metrics').
+
+The middleware is sync and async capable, so async views are not run
+through an extra sync/async hop just to be measured.
+
+settings.QUERY_BUDGETS maps URL names (e.g. 'polls:index') to the most
+queries a request to that view may run. A request over its budget is
+logged as a warning, or raises QueryBudgetExceeded when
+settings.QUERY_BUDGET_ACTION is 'raise' (useful in tests).
+"""
+import logging
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_current_metrics = ContextVar('request_metrics', default=None)
+
+_SAVEPOINT_STATEMENTS = ('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT')
+
+
+class QueryBudgetExceeded(Exception):
+    """
+    Raised when a request runs more queries than its view's budget allows.
+    """
+
+
+class RequestMetrics:
+    """
+    Measurements collected while handling one request.
+    """
+    def __init__(self) -> None:
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        """
+        Database execute wrapper timing every statement and counting queries.
+        Savepoint statements are timed but not counted, so that a view's
+        count does not depend on how deeply its transaction is nested.
+        """
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            if not sql.startswith(_SAVEPOINT_STATEMENTS):
+                self.queries += 1
+
+    def server_timing(self, total: float) -> str:
+        """
+        Return the metrics as a Server-Timing header value (durations in ms).
+
+        Args:
+            total (float): Seconds spent handling the request.
+        """
+        return ', '.join([
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.queries} queries"',
+            f'tpl;dur={self.template_time * 1000:.1f}',
+            f'cache;desc="hit={self.cache_hits} miss={self.cache_misses}"',
+            f'total;dur={total * 1000:.1f}',
+        ])
+
+
+def _measure_query(execute, sql, params, many, context):
+    """
+    Database execute wrapper handing each statement to the metrics of the
+    request being handled, if any.
+    """
+    metrics = _current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    return metrics(execute, sql, params, many, context)
+
+
+def install_query_wrapper() -> None:
+    """
+    Install _measure_query on the current thread's database connections,
+    unless it is already there.
+    """
+    for connection in connections.all():
+        if _measure_query not in connection.execute_wrappers:
+            connection.execute_wrappers.append(_measure_query)
+
+
+def record_cache_access(hit: bool) -> None:
+    """
+    Count a cache hit or miss against the request being handled, if any.
+
+    Args:
+        hit (bool): True for a cache hit, False for a miss.
+    """
+    metrics = _current_metrics.get()
+    if metrics is None:
+        return
+    if hit:
+        metrics.cache_hits += 1
+    else:
+        metrics.cache_misses += 1
+
+
+class RequestMetricsMiddleware:
+    """
+    Collect per-request query, template and cache metrics and enforce
+    per-view query budgets.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response) -> None:
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        request.metrics = metrics
+        install_query_wrapper()
+        token = _current_metrics.set(metrics)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_metrics.reset(token)
+        return self.finish(request, response, metrics, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        request.metrics = metrics
+        # Queries run on the thread sync_to_async() hands database work to
+        await sync_to_async(install_query_wrapper)()
+        token = _current_metrics.set(metrics)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_metrics.reset(token)
+        return self.finish(request, response, metrics, time.perf_counter() - start)
+
+    def finish(self, request, response, metrics: RequestMetrics, total: float):
+        """
+        Add the Server-Timing header, log the metrics and check the budget.
+
+        Args:
+            total (float): Seconds spent handling the request.
+        """
+        response['Server-Timing'] = metrics.server_timing(total)
+        url_name = request.resolver_match.view_name if request.resolver_match else None
+        fields = {
+            'method': request.method,
+            'path': request.path,
+            'url_name': url_name,
+            'status': response.status_code,
+            'queries': metrics.queries,
+            'db_ms': round(metrics.db_time * 1000, 1),
+            'template_ms': round(metrics.template_time * 1000, 1),
+            'cache_hits': metrics.cache_hits,
+            'cache_misses': metrics.cache_misses,
+            'total_ms': round(total * 1000, 1),
+        }
+        logger.info(' '.join(f'{key}={value}' for key, value in fields.items()),
+                    extra={'metrics': fields})
+        self.check_budget(url_name, metrics)
+        return response
+
+    def process_template_response(self, request, response):
+        """
+        Time the rendering of a TemplateResponse, which happens after the view.
+        """
+        metrics = request.metrics
+        start = time.perf_counter()
+
+        def rendered(response):
+            metrics.template_time += time.perf_counter() - start
+
+        response.add_post_render_callback(rendered)
+        return response
+
+    def check_budget(self, url_name: str, metrics: RequestMetrics) -> None:
+        """
+        Log or raise if the request ran more queries than its view's budget.
+
+        Raises:
+            QueryBudgetExceeded: If over budget and QUERY_BUDGET_ACTION is 'raise'.
+        """
+        budget = settings.QUERY_BUDGETS.get(url_name)
+        if budget is None or metrics.queries <= budget:
+            return
+        message = f"{url_name} ran {metrics.queries} queries, over its budget of {budget}"
+        if settings.QUERY_BUDGET_ACTION == 'raise':
+            raise QueryBudgetExceeded(message)
+        logger.warning(message, extra={'metrics': {'url_name': url_name,
+                                                   'queries': metrics.queries,
+                                                   'budget': budget}})
@@ -0,0 +1,125 @@
+"""
+Read replica routing.
+
+ReplicaRouter sends reads to one of settings.DATABASE_REPLICAS, picked at
+random, and every write to the 'default' (primary) database. Reads go to
+the primary instead:
+
+- inside use_primary(), which is how cached values such as results
+  snapshots are built, so a lagging replica is never cached;
+- for the whole of a request with an unsafe method (e.g. a vote or a
+  sign-up) or to one of settings.DATABASE_PRIMARY_PATHS (the admin);
+- for DATABASE_PRIMARY_PIN_SECONDS after such a request, so users read
+  their own writes while the replicas catch up. ReplicaRouterMiddleware
+  remembers this in a cookie.
+
+Sessions are always read from the primary. With no replicas configured
+every query goes to 'default' as before.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+PRIMARY = 'default'
+PIN_COOKIE = 'pin_primary'
+
+_use_primary = ContextVar('use_primary', default=False)
+
+PRIMARY_ONLY_APPS = {'sessions'}
+
+
+@contextmanager
+def use_primary():
+    """
+    Send the reads made inside the block to the primary database.
+    """
+    token = _use_primary.set(True)
+    try:
+        yield
+    finally:
+        _use_primary.reset(token)
+
+
+class ReplicaRouter:
+    """
+    Database router sending reads to the replicas and writes to the primary.
+    """
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas:
+            return None
+        if _use_primary.get() or model._meta.app_label in PRIMARY_ONLY_APPS:
+            return PRIMARY
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {PRIMARY, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+
+class ReplicaRouterMiddleware:
+    """
+    Pin a request's reads to the primary database when it writes, goes to
+    the admin or comes within the pin window of an earlier write.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response) -> None:
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+
+        writes, pinned = self.pin(request)
+        token = _use_primary.set(pinned)
+        try:
+            response = self.get_response(request)
+        finally:
+            _use_primary.reset(token)
+        return self.remember(writes, response)
+
+    async def __acall__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return await self.get_response(request)
+
+        writes, pinned = self.pin(request)
+        token = _use_primary.set(pinned)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _use_primary.reset(token)
+        return self.remember(writes, response)
+
+    @staticmethod
+    def pin(request) -> tuple:
+        """
+        Return whether the request writes and whether its reads go to the primary.
+        """
+        writes = request.method not in ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+        pinned = (writes or PIN_COOKIE in request.COOKIES
+                  or request.path_info.startswith(tuple(settings.DATABASE_PRIMARY_PATHS)))
+        return writes, pinned
+
+    @staticmethod
+    def remember(writes: bool, response):
+        """
+        Set the pin cookie on the response to a successful write.
+        """
+        if writes and response.status_code < 400:
+            response.set_cookie(PIN_COOKIE, '1', max_age=settings.DATABASE_PRIMARY_PIN_SECONDS,
+                                httponly=True, samesite='Lax')
+        return response
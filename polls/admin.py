@@ -1,13 +1,59 @@
+from django import forms
 from django.contrib import admin
+from django.core.exceptions import ValidationError
+from django.forms.models import BaseInlineFormSet
+
+from .models import AuthorizedUser, Choice, Question, Vote, validate_choices
+
+
+class ChoiceInlineForm(forms.ModelForm):
+    """
+    Choice form whose text uniqueness is checked by ChoiceInlineFormSet.
+    The inline form excludes the question from full_clean(), so the
+    unique_choice_text_per_question constraint is not validated per form.
+    """
+    class Meta:
+        model = Choice
+        fields = ['choice_text']
+
+
+class ChoiceInlineFormSet(BaseInlineFormSet):
+    """
+    Validate the choice texts of a question with one query instead of one per choice.
+    """
+    def clean(self) -> None:
+        super().clean()
+        choices = [form.instance for form in self.forms
+                   if form.is_valid() and form.has_changed()
+                   and form not in self.deleted_forms]
+        if not choices:
+            return
+        for choice in choices:
+            choice.question = self.instance
+        try:
+            validate_choices(choices)
+        except ValidationError as error:
+            raise ValidationError(error.messages)
+
+
+class ChoiceInline(admin.TabularInline):
+    model = Choice
+    form = ChoiceInlineForm
+    formset = ChoiceInlineFormSet
+    extra = 3
+
+
+class QuestionAdmin(admin.ModelAdmin):
+    inlines = [ChoiceInline]
+    list_display = ['question_text', 'pub_date', 'end_date', 'vote_count', 'sharded_counters']
 
-from .models import AuthorizedUser, Choice, Question, Vote
 
 # Register your models here.
 model_list = [
     AuthorizedUser,
     Choice,
-    Question,
     Vote
 ]
 
 admin.site.register(model_list)
+admin.site.register(Question, QuestionAdmin)
@@ -0,0 +1,185 @@
+"""
+JSON API over poll questions, their results and votes.
+
+Question detail and results are served from the cached results snapshot
+and carry an ETag hashing the results payload and a Last-Modified of the
+question's latest vote, opening or closing, so clients polling for
+changes get cheap 304 responses. Voting
+reuses AuthorizedUser.can_vote() and submit_vote().
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpRequest, JsonResponse
+from django.utils import timezone
+from django.views.decorators.csrf import ensure_csrf_cookie
+from django.views.decorators.http import condition, require_GET, require_POST
+
+from .models import AuthorizedUser, Choice, Question
+from .pagination import encode_cursor, seek
+from .results import get_results_snapshot, patch_final_results_headers
+
+
+def serialize_question(question: dict) -> dict:
+    """
+    Return the public JSON fields of a question from its snapshot values,
+    or from values with the 'total_votes' annotation.
+    """
+    now = timezone.now()
+    return {
+        'id': question['id'],
+        'question_text': question['question_text'],
+        'pub_date': question['pub_date'],
+        'end_date': question['end_date'],
+        'is_published': question['pub_date'] <= now <= question['end_date'],
+        'total_votes': question.get('total_votes', question['vote_count']),
+    }
+
+
+def snapshot_or_none(question_id: int) -> dict:
+    """
+    Return the results snapshot of a question, or None if it does not exist
+    or is not published yet.
+    """
+    try:
+        snapshot = get_results_snapshot(question_id)
+    except Question.DoesNotExist:
+        return None
+    if snapshot['question']['pub_date'] > timezone.now():
+        return None
+    return snapshot
+
+
+def results_payload(snapshot: dict) -> dict:
+    """
+    Return the JSON body of the results endpoint for a results snapshot.
+    """
+    return {
+        'question': serialize_question(snapshot['question']),
+        'choices': snapshot['choices'],
+        'total_votes': snapshot['total_votes'],
+        'final': snapshot['final'],
+    }
+
+
+def question_etag(request: HttpRequest, question_id: int) -> str:
+    """
+    Return an ETag hashing the question's whole results payload, so it
+    changes with every vote, edit of the question or its choices, opening
+    or closing of the poll and finalization of its results.
+    """
+    snapshot = snapshot_or_none(question_id)
+    if snapshot is None:
+        return None
+    payload = json.dumps(results_payload(snapshot), cls=DjangoJSONEncoder, sort_keys=True)
+    return hashlib.md5(payload.encode()).hexdigest()
+
+
+def question_last_modified(request: HttpRequest, question_id: int):
+    """
+    Return the time of the latest vote on the question, or of its opening
+    or closing if that came later, if any.
+    """
+    snapshot = snapshot_or_none(question_id)
+    if snapshot is None:
+        return None
+    question = snapshot['question']
+    now = timezone.now()
+    stamps = [question['last_vote_at'], *(date for date in (question['pub_date'],
+                                                            question['end_date']) if date <= now)]
+    return max(filter(None, stamps), default=None)
+
+
+def not_found() -> JsonResponse:
+    return JsonResponse({'error': "Question not found."}, status=404)
+
+
+@require_GET
+def question_list(request: HttpRequest) -> JsonResponse:
+    """
+    List published questions, newest first, one keyset-paginated page at a time.
+    """
+    questions = Question.objects.published().with_vote_totals().values(
+        'id', 'question_text', 'pub_date', 'end_date', 'vote_count', 'total_votes'
+    )
+    try:
+        questions = seek(questions, request.GET.get('cursor'))
+    except ValueError:
+        return JsonResponse({'error': "Invalid page cursor."}, status=400)
+
+    page_size = settings.POLLS_PER_PAGE
+    page = list(questions[:page_size + 1])
+    next_cursor = None
+    if len(page) > page_size:
+        last = page[page_size - 1]
+        next_cursor = encode_cursor(last['pub_date'], last['id'])
+
+    return JsonResponse({
+        'results': [serialize_question(question) for question in page[:page_size]],
+        'next_cursor': next_cursor,
+    })
+
+
+@require_GET
+@ensure_csrf_cookie
+@condition(etag_func=question_etag, last_modified_func=question_last_modified)
+def question_detail(request: HttpRequest, question_id: int) -> JsonResponse:
+    """
+    Return a question and its choices.
+    """
+    snapshot = snapshot_or_none(question_id)
+    if snapshot is None:
+        return not_found()
+
+    data = serialize_question(snapshot['question'])
+    data['choices'] = [{'id': choice['id'], 'choice_text': choice['choice_text']}
+                       for choice in snapshot['choices']]
+    return JsonResponse(data)
+
+
+@require_GET
+@condition(etag_func=question_etag, last_modified_func=question_last_modified)
+def question_results(request: HttpRequest, question_id: int) -> JsonResponse:
+    """
+    Return the per-choice vote counts and percentages of a question.
+    Final results may be cached by clients and shared caches.
+    """
+    snapshot = snapshot_or_none(question_id)
+    if snapshot is None:
+        return not_found()
+
+    response = JsonResponse(results_payload(snapshot))
+    if snapshot['final']:
+        patch_final_results_headers(response, public=True)
+    return response
+
+
+@require_POST
+def question_vote(request: HttpRequest, question_id: int) -> JsonResponse:
+    """
+    Cast or change the current user's vote. Expects a form-encoded
+    'choice' field, like the HTML vote form.
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': "Authentication required."}, status=401)
+
+    try:
+        question = Question.objects.get(pk=question_id)
+    except Question.DoesNotExist:
+        return not_found()
+
+    authorized_user = AuthorizedUser()
+    if not authorized_user.can_vote(request, question):
+        return JsonResponse({'error': "Voting on this poll is not allowed."}, status=403)
+
+    try:
+        authorized_user.submit_vote(request, question)
+    except (KeyError, ValueError, Choice.DoesNotExist):
+        return JsonResponse({'error': "You didn't select a valid choice."}, status=400)
+
+    if settings.VOTE_INGEST_MODE == 'queued':
+        return JsonResponse({'status': "queued"}, status=202)
+    return JsonResponse({'status': "recorded",
+                         'results': get_results_snapshot(question_id)['choices']})
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class PollsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'polls'
+
+    def ready(self) -> None:
+        from . import live, signals  # noqa: F401
@@ -0,0 +1,195 @@
+"""
+Cold storage for old polls.
+
+archive_question() moves a closed question's choices, votes, vote events
+and trend rollups into a gzip-compressed NDJSON file of fixture records
+(see polls/streaming.py) under settings.POLL_ARCHIVE_DIR, then deletes
+them from the live tables. The question row, its FinalResults and a
+PollArchive summary stay behind, so the poll list and the results page
+still show its totals. restore_question() reads the file back.
+
+Rows are streamed out and deleted in chunks with plain DELETE statements,
+which skip the per-vote signals, so archiving a poll with millions of
+votes runs in constant memory and the caches are invalidated once per
+poll.
+"""
+import datetime
+import gzip
+import os
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from .fragments import bump_question_version
+from .models import (Choice, ChoiceCounterShard, PollArchive, Question, Vote, VoteEvent,
+                     VoteRollup, delete_in_chunks)
+from .results import build_results_snapshot, invalidate_results_snapshot
+from .streaming import RecordWriter, _as_datetime, iter_records
+from .votemap import invalidate_many_user_votes, invalidate_user_votes
+
+# The models moved to the archive, in dependency order, with their fields.
+ARCHIVED_MODELS = {
+    'polls.choice': (Choice, ['question', 'choice_text', 'vote_count']),
+    'polls.vote': (Vote, ['question', 'choice', 'user']),
+    'polls.voteevent': (VoteEvent, ['created_at', 'user', 'question', 'old_choice',
+                                    'new_choice']),
+    'polls.voterollup': (VoteRollup, ['question', 'choice', 'granularity', 'bucket_start',
+                                      'gained', 'lost']),
+}
+
+
+def archive_path(question_id: int) -> Path:
+    """
+    Return the path of a question's archive file.
+    """
+    return Path(settings.POLL_ARCHIVE_DIR) / f'question-{question_id}.ndjson.gz'
+
+
+def iter_archive_records(question_id: int, final_votes: dict, chunk_size: int):
+    """
+    Yield the fixture records of a question's archived rows, streaming them
+    from the database in chunks. Choices carry their final vote counts.
+    """
+    for label, (model, fields) in ARCHIVED_MODELS.items():
+        columns = [model._meta.get_field(field).attname for field in fields]
+        rows = model.objects.filter(question_id=question_id).order_by('pk').values_list(
+            'pk', *columns)
+        for row in rows.iterator(chunk_size=chunk_size):
+            record = {'model': label, 'pk': row[0], 'fields': dict(zip(fields, row[1:]))}
+            if label == 'polls.choice':
+                record['fields']['vote_count'] = final_votes.get(row[0], 0)
+            yield record
+
+
+def archive_question(question_id: int, chunk_size: int = 2000) -> PollArchive:
+    """
+    Move a closed question's choices, votes, vote events and rollups to its
+    archive file, leaving its final results and a PollArchive summary.
+
+    The file is written completely before any row is deleted.
+
+    Args:
+        question_id (int): The primary key of the question.
+        chunk_size (int): Rows read or deleted per query.
+
+    Returns:
+        PollArchive: The summary of the archived question.
+
+    Raises:
+        ValueError: If the question's results are not final yet.
+    """
+    snapshot = build_results_snapshot(question_id)
+    if not snapshot['final']:
+        raise ValueError(f"Question {question_id} is not closed and finalized yet.")
+    final_votes = {choice['id']: choice['votes'] for choice in snapshot['choices']}
+
+    path = archive_path(question_id)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial = path.with_name(path.name + '.partial')
+    counts = {label: 0 for label in ARCHIVED_MODELS}
+    with gzip.open(partial, 'wt', encoding='utf-8') as stream:
+        writer = RecordWriter(stream, 'ndjson')
+        for record in iter_archive_records(question_id, final_votes, chunk_size):
+            writer.write(record)
+            counts[record['model']] += 1
+    os.replace(partial, path)
+
+    with transaction.atomic():
+        archive = PollArchive.objects.create(
+            question_id=question_id, path=str(path),
+            choice_count=counts['polls.choice'], vote_count=counts['polls.vote'])
+        delete_in_chunks(Vote.objects.filter(question_id=question_id), chunk_size,
+                         lambda votes: invalidate_many_user_votes(
+                             votes.values_list('user_id', flat=True)))
+        for model in (VoteEvent, VoteRollup, ChoiceCounterShard, Choice):
+            delete_in_chunks(model.objects.filter(question_id=question_id), chunk_size)
+        invalidate_results_snapshot(question_id)
+        bump_question_version(question_id)
+    return archive
+
+
+def archive_polls(days: int, chunk_size: int = 2000) -> list:
+    """
+    Archive every question closed for more than a number of days. Questions
+    still within settings.FINAL_RESULTS_GRACE_PERIOD are left for later.
+
+    Returns:
+        list: The PollArchive summaries written.
+    """
+    now = timezone.now()
+    cutoff = min(now - datetime.timedelta(days=days),
+                 now - datetime.timedelta(seconds=settings.FINAL_RESULTS_GRACE_PERIOD))
+    pending = Question.objects.closed(cutoff).filter(archive__isnull=True).values_list(
+        'pk', flat=True)
+    return [archive_question(question_id, chunk_size) for question_id in list(pending)]
+
+
+def restore_question(question_id: int, batch_size: int = 1000) -> int:
+    """
+    Move an archived question's rows back into the live tables and delete
+    its archive file and summary. Votes and vote events of users deleted in
+    the meantime are dropped or kept without a user, respectively.
+
+    Args:
+        question_id (int): The primary key of the archived question.
+        batch_size (int): Rows inserted per query.
+
+    Returns:
+        int: The number of rows restored.
+
+    Raises:
+        PollArchive.DoesNotExist: If the question is not archived.
+    """
+    archive = PollArchive.objects.get(question_id=question_id)
+    restored = 0
+    with transaction.atomic():
+        with gzip.open(archive.path, 'rt', encoding='utf-8') as stream:
+            batch = []
+            for record in iter_records(stream, 'ndjson'):
+                if batch and (batch[-1]['model'] != record['model'] or len(batch) >= batch_size):
+                    restored += restore_records(batch)
+                    batch = []
+                batch.append(record)
+            restored += restore_records(batch)
+        archive.delete()
+        invalidate_results_snapshot(question_id)
+        bump_question_version(question_id)
+        transaction.on_commit(lambda: os.remove(archive.path))
+    return restored
+
+
+def restore_records(records: list) -> int:
+    """
+    Insert a batch of archived records of one model.
+
+    Returns:
+        int: The number of rows inserted.
+    """
+    if not records:
+        return 0
+    model, fields = ARCHIVED_MODELS[records[0]['model']]
+    user_ids = None
+    if 'user' in fields:
+        user_ids = set(User.objects.filter(
+            pk__in={record['fields']['user'] for record in records}).values_list('pk', flat=True))
+
+    rows = []
+    for record in records:
+        values = {model._meta.get_field(field).attname: value
+                  for field, value in record['fields'].items()}
+        if user_ids is not None and values['user_id'] not in user_ids:
+            if model is Vote:
+                continue
+            values['user_id'] = None
+        for field in ('created_at', 'bucket_start'):
+            if field in values:
+                values[field] = _as_datetime(values[field])
+        rows.append(model(pk=record['pk'], **values))
+    model.objects.bulk_create(rows)
+    if model is Vote:
+        for user_id in {row.user_id for row in rows}:
+            invalidate_user_votes(user_id)
+    return len(rows)
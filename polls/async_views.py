@@ -0,0 +1,98 @@
+"""
+Async-native versions of the detail, results and vote views.
+
+They are used instead of their counterparts in polls.views when
+settings.POLLS_ASYNC_VIEWS is on, and avoid a thread hop per request when
+served through the ASGI entry point (mysite/asgi.py).
+"""
+from django.contrib import messages
+from django.contrib.auth.views import redirect_to_login
+from django.http import Http404, HttpRequest, HttpResponse, HttpResponseRedirect
+from django.shortcuts import redirect, render
+from django.urls import reverse
+from django.utils import timezone
+from django.views import View
+
+from .models import AuthorizedUser, Choice, Question, aget_request_user
+from .results import aget_results_snapshot, patch_final_results_headers
+from .trends import aget_vote_trend
+from .votemap import aget_request_votes
+
+
+class DetailView(View):
+    """
+    Async view for displaying the details of a poll question.
+    """
+    template_name = 'polls/detail.html'
+
+    async def get(self, request: HttpRequest, pk: int) -> HttpResponse | HttpResponseRedirect:
+        await aget_request_user(request)
+        try:
+            now = timezone.now()
+            question = await Question.objects.published(now).with_status(
+                now
+            ).prefetch_related('choice_set').aget(pk=pk)
+        except Question.DoesNotExist:
+            messages.error(request, "You don't have access to that page")
+            return redirect(reverse('polls:index'))
+
+        return render(request, self.template_name, {
+            'question': question,
+            'voted_choice_id': (await aget_request_votes(request)).get(question.id),
+        })
+
+
+class ResultsView(View):
+    """
+    Async view for displaying the results of a poll question from the
+    cached results snapshot and vote trend, or from the snapshot alone for
+    final results, which clients may cache.
+    """
+    template_name = 'polls/results.html'
+
+    async def get(self, request: HttpRequest, pk: int) -> HttpResponse:
+        await aget_request_user(request)
+        try:
+            snapshot = await aget_results_snapshot(pk)
+        except Question.DoesNotExist:
+            raise Http404("No question found matching the query")
+
+        final = snapshot['final']
+        response = render(request, self.template_name, {
+            'question': Question(**snapshot['question']),
+            'results': snapshot,
+            'trend': None if final else await aget_vote_trend(pk),
+        })
+        if final:
+            patch_final_results_headers(response, public=not request.user.is_authenticated)
+        return response
+
+
+async def vote(request: HttpRequest, question_id: int) -> HttpResponseRedirect:
+    """
+    Async view for submitting votes on poll questions.
+    """
+    user = await aget_request_user(request)
+    if not user.is_authenticated:
+        return redirect_to_login(request.get_full_path())
+
+    try:
+        question = await Question.objects.aget(pk=question_id)
+    except Question.DoesNotExist:
+        raise Http404("No question found matching the query")
+
+    try:
+        authorized_user = AuthorizedUser()
+
+        if await authorized_user.acan_vote(request, question):
+            await authorized_user.asubmit_vote(request, question)
+            messages.success(request, 'Vote has been successfully submitted.')
+            return redirect(reverse('polls:results', args=(question.id,)))
+        else:
+            messages.error(request, "Voting on this poll is not allowed.")
+
+    except (KeyError, ValueError, Choice.DoesNotExist):
+        # Redisplay the question voting form.
+        messages.error(request, "You didn't select a choice.")
+
+    return redirect(reverse('polls:detail', args=(question.id,)))
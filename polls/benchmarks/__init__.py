@@ -0,0 +1,16 @@
+"""
+Benchmarks for the polls views.
+
+The suite seeds questions, choices, users and votes in bulk, drives the
+views through the Django test client and reports latency percentiles,
+queries per request and throughput as JSON. Run it with the
+'benchmark_polls' management command.
+"""
+from .concurrency import compare_sync_async
+from .counters import compare_counter_modes
+from .profiles import PROFILES, compare_database_profiles
+from .runner import SCENARIOS, run_benchmarks
+from .seed import seed_polls
+
+__all__ = ['PROFILES', 'SCENARIOS', 'compare_counter_modes', 'compare_database_profiles',
+           'compare_sync_async', 'run_benchmarks', 'seed_polls']
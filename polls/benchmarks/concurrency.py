@@ -0,0 +1,145 @@
+"""
+Sync vs async throughput under concurrent load.
+
+The sync views are driven from a pool of threads, each with its own test
+Client, the way a threaded WSGI server would run them. The async views are
+driven by concurrent AsyncClient requests on one event loop, the way an
+ASGI server would run them.
+"""
+import asyncio
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import ModuleType
+
+from django.contrib.auth.models import User
+from django.db import close_old_connections
+from django.test import AsyncClient, Client, override_settings
+from django.urls import include, path, reverse
+
+from polls.urls import get_urlpatterns
+
+from .runner import summarize
+
+
+def build_urlconf(async_views_enabled: bool) -> ModuleType:
+    """
+    Return a root URLconf serving the polls app with the sync or async views.
+    """
+    polls_urls = ModuleType('polls_urls')
+    polls_urls.app_name = 'polls'
+    polls_urls.urlpatterns = get_urlpatterns(async_views_enabled)
+
+    urlconf = ModuleType('benchmark_urls')
+    urlconf.urlpatterns = [
+        path('accounts/', include('django.contrib.auth.urls')),
+        path('polls/', include(polls_urls)),
+    ]
+    return urlconf
+
+
+def request_plan(data: dict, scenario: str, requests: int, seed: int) -> list:
+    """
+    Return the (method, url, post data) of each request of a scenario.
+    """
+    rng = random.Random(seed)
+    plan = []
+    for _ in range(requests):
+        question_id = rng.choice(data['question_ids'])
+        if scenario == 'vote':
+            plan.append(('post', reverse('polls:vote', args=(question_id,)),
+                         {'choice': rng.choice(data['choice_ids'][question_id])}))
+        else:
+            plan.append(('get', reverse(f'polls:{scenario}', args=(question_id,)), None))
+    return plan
+
+
+def summarize_samples(results: list, elapsed: float) -> dict:
+    """
+    Summarize the (latency, status code) samples of every worker; server
+    errors (such as "database is locked") are counted separately.
+    """
+    samples = [sample for result in results for sample in result]
+    summary = summarize([latency for latency, _ in samples], None, elapsed)
+    summary['errors'] = sum(1 for _, status in samples if status >= 500)
+    return summary
+
+
+def run_sync(plan: list, users: list, concurrency: int) -> dict:
+    """
+    Run a request plan against the sync views from a pool of threads.
+    """
+    clients = []
+    for index in range(concurrency):
+        client = Client(raise_request_exception=False)
+        client.force_login(users[index % len(users)])
+        clients.append(client)
+
+    def worker(index: int) -> list:
+        client = clients[index]
+        samples = []
+        for method, url, data in plan[index::concurrency]:
+            started = time.perf_counter()
+            response = getattr(client, method)(url, data)
+            samples.append((time.perf_counter() - started, response.status_code))
+        close_old_connections()
+        return samples
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(worker, range(concurrency)))
+    return summarize_samples(results, time.perf_counter() - started)
+
+
+def run_async(plan: list, users: list, concurrency: int) -> dict:
+    """
+    Run a request plan against the async views with concurrent AsyncClients.
+    """
+    clients = []
+    for index in range(concurrency):
+        client = AsyncClient(raise_request_exception=False)
+        client.force_login(users[index % len(users)])
+        clients.append(client)
+
+    async def worker(index: int) -> list:
+        samples = []
+        for method, url, data in plan[index::concurrency]:
+            started = time.perf_counter()
+            response = await getattr(clients[index], method)(url, data)
+            samples.append((time.perf_counter() - started, response.status_code))
+        return samples
+
+    async def main() -> list:
+        return await asyncio.gather(*(worker(index) for index in range(concurrency)))
+
+    started = time.perf_counter()
+    results = asyncio.run(main())
+    return summarize_samples(results, time.perf_counter() - started)
+
+
+def compare_sync_async(data: dict, scenarios: list, requests: int,
+                       concurrency: int, seed: int = 0) -> dict:
+    """
+    Run each scenario against the sync and the async views under the same
+    concurrent load.
+
+    Args:
+        data (dict): The ids returned by seed_polls().
+        scenarios (list): Any of 'detail', 'results' and 'vote'.
+        requests (int): The number of requests per scenario and mode.
+        concurrency (int): The number of concurrent clients.
+        seed (int): Seed for picking questions and choices.
+
+    Returns:
+        dict: For each scenario, the 'sync' and 'async' summaries.
+    """
+    users = list(User.objects.filter(pk__in=data['user_ids'][:concurrency]))
+    report = {}
+    for scenario in scenarios:
+        plan = request_plan(data, scenario, requests, seed)
+        report[scenario] = {}
+        with override_settings(ROOT_URLCONF=build_urlconf(False)):
+            report[scenario]['sync'] = run_sync(plan, users, concurrency)
+        with override_settings(ROOT_URLCONF=build_urlconf(True)):
+            report[scenario]['async'] = run_async(plan, users, concurrency)
+    return report
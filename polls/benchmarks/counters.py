@@ -0,0 +1,51 @@
+"""
+Single-row vs sharded vote counters on one hot question.
+
+Every vote of the plan goes to the same question, once with its counters
+on the Choice and Question rows and once with 'sharded_counters' set, from
+the same pool of concurrent clients. The gain shows on databases with
+row-level locking such as PostgreSQL; SQLite serializes every writer on
+its database lock whatever rows they touch.
+"""
+import random
+
+from django.contrib.auth.models import User
+from django.test import override_settings
+from django.urls import reverse
+
+from polls.models import ChoiceCounterShard, Question, Vote, rebuild_vote_counts
+
+from .concurrency import build_urlconf, run_sync
+
+
+def compare_counter_modes(data: dict, requests: int, concurrency: int, seed: int = 0) -> dict:
+    """
+    Run a concurrent vote plan on one question with single-row and with
+    sharded counters.
+
+    Args:
+        data (dict): The ids returned by seed_polls().
+        requests (int): The number of votes per mode.
+        concurrency (int): The number of concurrent clients.
+        seed (int): Seed for picking choices.
+
+    Returns:
+        dict: The 'single_row' and 'sharded' summaries.
+    """
+    rng = random.Random(seed)
+    question_id = data['question_ids'][0]
+    url = reverse('polls:vote', args=(question_id,))
+    plan = [('post', url, {'choice': rng.choice(data['choice_ids'][question_id])})
+            for _ in range(requests)]
+    users = list(User.objects.filter(pk__in=data['user_ids'][:concurrency]))
+
+    report = {}
+    for mode, sharded in (('single_row', False), ('sharded', True)):
+        Vote.objects.filter(question_id=question_id).delete()
+        ChoiceCounterShard.objects.filter(question_id=question_id).delete()
+        rebuild_vote_counts()
+        Question.objects.filter(pk=question_id).update(sharded_counters=sharded)
+        with override_settings(ROOT_URLCONF=build_urlconf(False)):
+            report[mode] = run_sync(plan, users, concurrency)
+    Question.objects.filter(pk=question_id).update(sharded_counters=False)
+    return report
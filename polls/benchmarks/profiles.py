@@ -0,0 +1,68 @@
+"""
+Concurrent vote throughput across database profiles.
+
+Each profile is a set of connection settings and SQLite pragmas applied to
+the benchmark database: SQLite with its default rollback journal versus
+WAL, or PostgreSQL with a connection per request versus persistent,
+health-checked connections. The same concurrent vote plan is run under
+every profile of the configured database's vendor.
+"""
+from django.contrib.auth.models import User
+from django.db import connections
+from django.test import override_settings
+
+from .concurrency import build_urlconf, request_plan, run_sync
+
+PROFILES = {
+    'sqlite': {
+        'sqlite-default': {
+            'CONN_MAX_AGE': 0,
+            'SQLITE_PRAGMAS': {'journal_mode': 'DELETE', 'synchronous': 'FULL'},
+        },
+        'sqlite-wal': {
+            'CONN_MAX_AGE': 60,
+            'SQLITE_PRAGMAS': {'journal_mode': 'WAL', 'synchronous': 'NORMAL',
+                               'busy_timeout': 5000, 'mmap_size': 268435456},
+        },
+    },
+    'postgresql': {
+        'postgres-per-request': {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False},
+        'postgres-persistent': {'CONN_MAX_AGE': 60, 'CONN_HEALTH_CHECKS': True},
+    },
+}
+
+
+def compare_database_profiles(data: dict, requests: int, concurrency: int,
+                              seed: int = 0, alias: str = 'default') -> dict:
+    """
+    Run the same concurrent vote plan under each profile of the database.
+
+    Args:
+        data (dict): The ids returned by seed_polls().
+        requests (int): The number of votes per profile.
+        concurrency (int): The number of concurrent clients.
+        seed (int): Seed for picking questions and choices.
+        alias (str): The database alias to reconfigure.
+
+    Returns:
+        dict: For each profile, the summary of its vote run.
+    """
+    settings_dict = connections[alias].settings_dict
+    original = {key: settings_dict.get(key) for key in ('CONN_MAX_AGE', 'CONN_HEALTH_CHECKS')}
+    users = list(User.objects.filter(pk__in=data['user_ids'][:concurrency]))
+    plan = request_plan(data, 'vote', requests, seed)
+
+    report = {}
+    try:
+        for name, profile in PROFILES.get(connections[alias].vendor, {}).items():
+            connections.close_all()
+            for key in ('CONN_MAX_AGE', 'CONN_HEALTH_CHECKS'):
+                if key in profile:
+                    settings_dict[key] = profile[key]
+            with override_settings(ROOT_URLCONF=build_urlconf(False),
+                                   SQLITE_PRAGMAS=profile.get('SQLITE_PRAGMAS', {})):
+                report[name] = run_sync(plan, users, concurrency)
+                connections.close_all()
+    finally:
+        settings_dict.update(original)
+    return report
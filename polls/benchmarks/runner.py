@@ -0,0 +1,108 @@
+import math
+import random
+import time
+
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+
+def percentile(samples: list, percent: float) -> float:
+    """
+    Return the nearest-rank percentile of a list of samples.
+    """
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(math.ceil(percent / 100 * len(ordered)), 1)
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def summarize(latencies: list, query_counts: list, elapsed: float) -> dict:
+    """
+    Summarize per-request latencies (in seconds) and query counts.
+    Pass None as query_counts when queries were not captured.
+    """
+    requests = len(latencies)
+    summary = {
+        'requests': requests,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+        'mean_ms': round(sum(latencies) / requests * 1000, 3) if requests else 0.0,
+        'throughput_rps': round(requests / elapsed, 2) if elapsed else 0.0,
+    }
+    if query_counts is not None:
+        summary['queries_per_request'] = (round(sum(query_counts) / requests, 2)
+                                          if requests else 0.0)
+    return summary
+
+
+def measure(make_request, requests: int) -> dict:
+    """
+    Call make_request the given number of times and summarize the results.
+    """
+    latencies = []
+    query_counts = []
+    started = time.perf_counter()
+    for _ in range(requests):
+        with CaptureQueriesContext(connection) as queries:
+            request_started = time.perf_counter()
+            make_request()
+            latencies.append(time.perf_counter() - request_started)
+        query_counts.append(len(queries))
+    return summarize(latencies, query_counts, time.perf_counter() - started)
+
+
+def bench_index(client: Client, data: dict, rng: random.Random, requests: int) -> dict:
+    url = reverse('polls:index')
+    return measure(lambda: client.get(url), requests)
+
+
+def bench_detail(client: Client, data: dict, rng: random.Random, requests: int) -> dict:
+    return measure(lambda: client.get(
+        reverse('polls:detail', args=(rng.choice(data['question_ids']),))
+    ), requests)
+
+
+def bench_results(client: Client, data: dict, rng: random.Random, requests: int) -> dict:
+    return measure(lambda: client.get(
+        reverse('polls:results', args=(rng.choice(data['question_ids']),))
+    ), requests)
+
+
+def bench_vote(client: Client, data: dict, rng: random.Random, requests: int) -> dict:
+    def cast_vote():
+        question_id = rng.choice(data['question_ids'])
+        client.post(reverse('polls:vote', args=(question_id,)),
+                    {'choice': rng.choice(data['choice_ids'][question_id])})
+    return measure(cast_vote, requests)
+
+
+SCENARIOS = {
+    'index': bench_index,
+    'detail': bench_detail,
+    'results': bench_results,
+    'vote': bench_vote,
+}
+
+
+def run_benchmarks(data: dict, scenarios: list, requests: int, seed: int = 0) -> dict:
+    """
+    Run the named scenarios against seeded data as a logged-in user.
+
+    Args:
+        data (dict): The ids returned by seed_polls().
+        scenarios (list): Names of entries in SCENARIOS.
+        requests (int): The number of requests per scenario.
+        seed (int): Seed for picking questions and choices.
+
+    Returns:
+        dict: The summary of each scenario, keyed by name.
+    """
+    from django.contrib.auth.models import User
+
+    rng = random.Random(seed)
+    client = Client()
+    client.force_login(User.objects.get(pk=data['user_ids'][0]))
+    return {name: SCENARIOS[name](client, data, rng, requests) for name in scenarios}
@@ -0,0 +1,60 @@
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+
+from polls.models import Choice, Question, Vote, now_plus, rebuild_vote_counts
+
+BENCHMARK_PASSWORD = 'benchmark-pass'
+
+
+def seed_polls(questions: int, choices: int, users: int, seed: int = 0) -> dict:
+    """
+    Create open poll questions, their choices, users and one vote per user
+    per question, all with bulk inserts.
+
+    Args:
+        questions (int): The number of questions to create.
+        choices (int): The number of choices per question.
+        users (int): The number of users; each votes on every question.
+        seed (int): Seed for the random choice of votes.
+
+    Returns:
+        dict: The ids of the created questions, choices (per question) and users.
+    """
+    rng = random.Random(seed)
+    password = make_password(BENCHMARK_PASSWORD)
+
+    created_questions = Question.objects.bulk_create(
+        Question(question_text=f"Benchmark question {i}",
+                 pub_date=now_plus(-1), end_date=now_plus(30))
+        for i in range(questions)
+    )
+    created_choices = Choice.objects.bulk_create(
+        Choice(question=question, choice_text=f"Choice {j}")
+        for question in created_questions
+        for j in range(choices)
+    )
+    created_users = User.objects.bulk_create(
+        User(username=f"benchmark-user-{k}", password=password)
+        for k in range(users)
+    )
+
+    choices_by_question = {}
+    for choice in created_choices:
+        choices_by_question.setdefault(choice.question_id, []).append(choice.id)
+
+    Vote.objects.bulk_create(
+        (Vote(user=user, question_id=question_id,
+              choice_id=rng.choice(choice_ids))
+         for user in created_users
+         for question_id, choice_ids in choices_by_question.items()),
+        batch_size=1000,
+    )
+    rebuild_vote_counts()
+
+    return {
+        'question_ids': [question.id for question in created_questions],
+        'choice_ids': choices_by_question,
+        'user_ids': [user.id for user in created_users],
+    }
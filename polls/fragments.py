@@ -0,0 +1,87 @@
+"""
+Versioned template fragment and page caching.
+
+Every question has a version in the cache that changes whenever the
+question, one of its choices or one of its votes is written. Template
+fragments showing a question (the poll list rows and the poll_info block)
+are cached under that version, so a write makes the old fragments
+unreachable instead of having to find and delete them. The poll list
+served to anonymous users is cached as a whole page under an index
+version that changes along with any question version.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpRequest
+
+INDEX_VERSION_KEY = 'polls:index-version'
+
+
+def question_version_key(question_id: int) -> str:
+    """
+    Return the cache key of a question's version.
+    """
+    return f'polls:question-version:{question_id}'
+
+
+def get_versions(keys: list) -> dict:
+    """
+    Return the versions stored under the given keys with one cache round
+    trip, starting a new version for every key that has none.
+    """
+    versions = cache.get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return versions
+
+
+def get_question_versions(question_ids: list) -> dict:
+    """
+    Return the versions of many questions, keyed by question id.
+    """
+    keys = {question_version_key(question_id): question_id for question_id in question_ids}
+    return {keys[key]: version for key, version in get_versions(list(keys)).items()}
+
+
+def get_question_version(question_id: int) -> int:
+    """
+    Return the version of a question.
+    """
+    return get_question_versions([question_id])[question_id]
+
+
+def bump_question_version(question_id: int) -> None:
+    """
+    Give a question, and the poll list, a new version, right away and again
+    once the current transaction commits, so fragments rendered from data
+    read before the commit are never served afterwards.
+    """
+    def bump() -> None:
+        version = time.time_ns()
+        cache.set_many({question_version_key(question_id): version,
+                        INDEX_VERSION_KEY: version}, None)
+
+    bump()
+    transaction.on_commit(bump)
+
+
+def index_page_cache_key(request: HttpRequest) -> str:
+    """
+    Return the cache key of the anonymous poll list page for a request,
+    under the current index version.
+    """
+    version = get_versions([INDEX_VERSION_KEY])[INDEX_VERSION_KEY]
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f'polls:index-page:{version}:{path}'
+
+
+def fragment_cache_settings(request: HttpRequest) -> dict:
+    """
+    Context processor exposing the fragment cache timeout to templates.
+    """
+    return {'fragment_cache_timeout': settings.FRAGMENT_CACHE_TIMEOUT}
@@ -0,0 +1,256 @@
+"""
+Batched vote ingestion.
+
+When settings.VOTE_INGEST_MODE is 'queued', AuthorizedUser.submit_vote
+validates a vote on the request thread and hands it to a VoteIngestor.
+A background worker drains the in-process queue and writes the votes in
+batches, each inside one transaction with bulk_create and bulk_update,
+so request threads no longer contend for the database write lock.
+
+Votes are applied in the order they were submitted and only the latest
+vote of a user per question is kept, so a user's latest vote always wins.
+While queued mode is on, all votes must go through the ingestor.
+"""
+import atexit
+import logging
+import queue
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .fragments import bump_question_version
+from .models import Choice, Question, Vote, VoteEvent
+from .results import invalidate_results_snapshot
+from .votemap import invalidate_user_votes
+
+logger = logging.getLogger(__name__)
+
+
+class VoteIngestor:
+    """
+    Queue votes in memory and write them to the database in batches.
+    """
+    def __init__(self, batch_size: int = 500, flush_interval: float = 0.5,
+                 max_queue_size: int = 10000) -> None:
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._flush_lock = threading.Lock()
+        self._retry = []
+        self._stopped = threading.Event()
+        self._worker = None
+
+    def submit(self, user_id: int, question_id: int, choice_id: int) -> None:
+        """
+        Queue a vote for writing. If the queue is full, the queued votes and
+        this vote are written synchronously on the calling thread instead.
+
+        Args:
+            user_id (int): The voting user.
+            question_id (int): The question voted on.
+            choice_id (int): The chosen choice, already validated.
+        """
+        vote = (user_id, question_id, choice_id)
+        try:
+            self._queue.put_nowait(vote)
+        except queue.Full:
+            self.flush(extra=[vote])
+
+    def flush(self, extra: list = None) -> int:
+        """
+        Write every queued vote (followed by any extra votes) to the database.
+
+        If a batch fails, it and the batches after it are kept and written
+        first on the next flush, so no vote is lost.
+
+        Returns:
+            int: The number of votes written.
+
+        Raises:
+            Exception: Whatever write_votes() raised for the failed batch.
+        """
+        with self._flush_lock:
+            pending = self._drain()
+            pending.extend(extra or [])
+            written = 0
+            for start in range(0, len(pending), self.batch_size):
+                try:
+                    written += write_votes(pending[start:start + self.batch_size])
+                except Exception:
+                    self._retry = pending[start:]
+                    raise
+            return written
+
+    def start(self) -> None:
+        """
+        Start the background worker thread if it is not running yet.
+        """
+        if self._worker is None or not self._worker.is_alive():
+            self._stopped.clear()
+            self._worker = threading.Thread(target=self._run, name='vote-ingestor',
+                                            daemon=True)
+            self._worker.start()
+
+    def stop(self) -> None:
+        """
+        Stop the background worker and write any votes still queued.
+        """
+        self._stopped.set()
+        if self._worker is not None:
+            self._worker.join()
+            self._worker = None
+        self.flush()
+
+    def _drain(self) -> list:
+        """
+        Remove and return the votes of a failed flush followed by every vote
+        currently in the queue.
+        """
+        pending, self._retry = self._retry, []
+        while True:
+            try:
+                pending.append(self._queue.get_nowait())
+            except queue.Empty:
+                return pending
+
+    def _run(self) -> None:
+        """
+        Flush once a batch is full or the flush interval has elapsed.
+        """
+        while not self._stopped.is_set():
+            self._stopped.wait(self.flush_interval)
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Failed to write a batch of votes")
+            finally:
+                close_old_connections()
+
+
+def write_votes(votes: list) -> int:
+    """
+    Write a batch of votes in a single transaction.
+
+    Later votes of a user on the same question replace earlier ones, votes
+    of deleted users or choices are dropped, and a VoteEvent is appended
+    for each vote created or changed. The vote counters are adjusted with
+    one F() update per affected choice and question, the questions'
+    'last_vote_at' is stamped, and the results snapshots and cached
+    fragments of those questions and the voters' vote maps are invalidated.
+
+    Args:
+        votes (list): (user_id, question_id, choice_id) tuples in submission order.
+
+    Returns:
+        int: The number of votes created or changed.
+    """
+    latest = {}
+    for user_id, question_id, choice_id in votes:
+        latest[(user_id, question_id)] = choice_id
+    if not latest:
+        return 0
+
+    choice_deltas = Counter()
+    question_deltas = Counter()
+    to_create = []
+    to_update = []
+    events = []
+
+    with transaction.atomic():
+        voters = {user_id for user_id, _ in latest}
+        latest = drop_invalid_votes(latest)
+        user_ids = {user_id for user_id, _ in latest}
+        question_ids = {question_id for _, question_id in latest}
+        existing = {
+            (vote.user_id, vote.question_id): vote
+            for vote in Vote.objects.filter(user_id__in=user_ids,
+                                            question_id__in=question_ids)
+        }
+        for (user_id, question_id), choice_id in latest.items():
+            vote = existing.get((user_id, question_id))
+            if vote is None:
+                to_create.append(Vote(user_id=user_id, question_id=question_id,
+                                      choice_id=choice_id))
+                events.append(VoteEvent(user_id=user_id, question_id=question_id,
+                                        new_choice_id=choice_id))
+                choice_deltas[choice_id] += 1
+                question_deltas[question_id] += 1
+            elif vote.choice_id != choice_id:
+                events.append(VoteEvent(user_id=user_id, question_id=question_id,
+                                        old_choice_id=vote.choice_id, new_choice_id=choice_id))
+                choice_deltas[vote.choice_id] -= 1
+                choice_deltas[choice_id] += 1
+                vote.choice_id = choice_id
+                to_update.append(vote)
+
+        Vote.objects.bulk_create(to_create)
+        Vote.objects.bulk_update(to_update, ['choice'])
+        VoteEvent.objects.bulk_create(events)
+
+        for choice_id, delta in choice_deltas.items():
+            if delta:
+                Choice.objects.filter(pk=choice_id).update(vote_count=F('vote_count') + delta)
+        voted_at = timezone.now()
+        for question_id in question_ids:
+            Question.objects.filter(pk=question_id).update(
+                vote_count=F('vote_count') + question_deltas[question_id],
+                last_vote_at=voted_at)
+
+        for question_id in question_ids:
+            invalidate_results_snapshot(question_id)
+            bump_question_version(question_id)
+        for user_id in voters:
+            invalidate_user_votes(user_id)
+
+    return len(to_create) + len(to_update)
+
+
+def drop_invalid_votes(latest: dict) -> dict:
+    """
+    Drop the votes whose user or choice no longer exists, or whose choice
+    belongs to another question, e.g. because it was deleted while the vote
+    was queued, so they cannot fail the rest of their batch.
+
+    Args:
+        latest (dict): Choice ids keyed by (user_id, question_id).
+
+    Returns:
+        dict: The valid votes, in the same form.
+    """
+    choice_questions = dict(Choice.objects.filter(
+        pk__in=set(latest.values())).values_list('pk', 'question_id'))
+    user_ids = set(User.objects.filter(
+        pk__in={user_id for user_id, _ in latest}).values_list('pk', flat=True))
+    valid = {(user_id, question_id): choice_id
+             for (user_id, question_id), choice_id in latest.items()
+             if user_id in user_ids and choice_questions.get(choice_id) == question_id}
+    if len(valid) < len(latest):
+        logger.warning("Dropped %d queued votes of deleted users or choices",
+                       len(latest) - len(valid))
+    return valid
+
+
+_ingestor = None
+_ingestor_lock = threading.Lock()
+
+
+def get_vote_ingestor() -> VoteIngestor:
+    """
+    Return the process-wide VoteIngestor, starting its worker on first use.
+    """
+    global _ingestor
+    with _ingestor_lock:
+        if _ingestor is None:
+            _ingestor = VoteIngestor(
+                batch_size=settings.VOTE_INGEST_BATCH_SIZE,
+                flush_interval=settings.VOTE_INGEST_FLUSH_INTERVAL,
+                max_queue_size=settings.VOTE_INGEST_MAX_QUEUE_SIZE,
+            )
+            _ingestor.start()
+            atexit.register(_ingestor.stop)
+        return _ingestor
@@ -0,0 +1,165 @@
+"""
+Live results streaming with Server-Sent Events.
+
+A single in-process ResultsBroadcaster fans results updates out to every
+watcher of a question. Votes only mark a question as changed; the new
+counts are computed once per coalescing window, no matter how many votes
+arrived or how many clients are watching, and every subscriber receives
+the same payload. Streaming needs the ASGI entry point (mysite/asgi.py).
+"""
+import asyncio
+import json
+import threading
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.dispatch import receiver
+
+from .results import get_results_snapshot, results_changed
+
+
+class _Channel:
+    """
+    The watchers of one question and the latest payload sent to them.
+    """
+    def __init__(self) -> None:
+        self.subscribers = 0
+        self.pending = False
+        self.version = 0
+        self.counts = None
+        self.payload = None
+        self.updated = asyncio.Event()
+
+
+class ResultsBroadcaster:
+    """
+    Compute results updates once and broadcast them to all subscribers.
+    """
+    def __init__(self, coalesce_window: float = None, keepalive: float = None) -> None:
+        self.coalesce_window = (settings.LIVE_RESULTS_COALESCE_WINDOW
+                                if coalesce_window is None else coalesce_window)
+        self.keepalive = settings.LIVE_RESULTS_KEEPALIVE if keepalive is None else keepalive
+        self._loop = None
+        self._channels = {}
+
+    def notify(self, question_id: int) -> None:
+        """
+        Mark a question's results as changed. Safe to call from any thread;
+        does nothing when nobody is watching.
+        """
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        loop.call_soon_threadsafe(self._schedule, question_id)
+
+    async def subscribe(self, question_id: int):
+        """
+        Yield the current results of a question, then the latest payload
+        after each update (or None when the keepalive interval passes
+        without an update). A slow subscriber skips straight to the latest
+        payload; each payload carries the full counts.
+
+        Raises:
+            Question.DoesNotExist: If there is no such question.
+        """
+        self._loop = asyncio.get_running_loop()
+        snapshot = await sync_to_async(get_results_snapshot)(question_id)
+        channel = self._channels.setdefault(question_id, _Channel())
+        if channel.counts is None:
+            channel.counts = self._counts(snapshot)
+        channel.subscribers += 1
+        seen = channel.version
+        try:
+            yield self._payload(snapshot, {})
+            while True:
+                if channel.version == seen:
+                    try:
+                        await asyncio.wait_for(channel.updated.wait(), self.keepalive)
+                    except asyncio.TimeoutError:
+                        yield None
+                        continue
+                seen = channel.version
+                yield channel.payload
+        finally:
+            channel.subscribers -= 1
+            if channel.subscribers == 0:
+                del self._channels[question_id]
+
+    def _schedule(self, question_id: int) -> None:
+        """
+        Publish an update after the coalescing window, unless one is already due.
+        """
+        channel = self._channels.get(question_id)
+        if channel is None or channel.pending:
+            return
+        channel.pending = True
+        self._loop.call_later(self.coalesce_window,
+                              lambda: asyncio.ensure_future(self._publish(question_id)))
+
+    async def _publish(self, question_id: int) -> None:
+        """
+        Compute the new results once and wake every subscriber.
+        """
+        channel = self._channels.get(question_id)
+        if channel is None:
+            return
+        channel.pending = False
+        snapshot = await sync_to_async(get_results_snapshot)(question_id)
+
+        counts = self._counts(snapshot)
+        deltas = {choice_id: votes - channel.counts.get(choice_id, 0)
+                  for choice_id, votes in counts.items()
+                  if votes != channel.counts.get(choice_id, 0)}
+        channel.counts = counts
+        channel.payload = self._payload(snapshot, deltas)
+        channel.version += 1
+
+        updated, channel.updated = channel.updated, asyncio.Event()
+        updated.set()
+
+    @staticmethod
+    def _counts(snapshot: dict) -> dict:
+        return {choice['id']: choice['votes'] for choice in snapshot['choices']}
+
+    @staticmethod
+    def _payload(snapshot: dict, deltas: dict) -> dict:
+        return {
+            'question_id': snapshot['question']['id'],
+            'total_votes': snapshot['total_votes'],
+            'choices': snapshot['choices'],
+            'deltas': deltas,
+        }
+
+
+def format_event(payload: dict) -> str:
+    """
+    Format a payload as a Server-Sent Event; None becomes a keepalive comment.
+    """
+    if payload is None:
+        return ': keepalive\n\n'
+    return f'event: results\ndata: {json.dumps(payload, cls=DjangoJSONEncoder)}\n\n'
+
+
+_broadcaster = None
+_broadcaster_lock = threading.Lock()
+
+
+def get_broadcaster() -> ResultsBroadcaster:
+    """
+    Return the process-wide ResultsBroadcaster.
+    """
+    global _broadcaster
+    with _broadcaster_lock:
+        if _broadcaster is None:
+            _broadcaster = ResultsBroadcaster()
+        return _broadcaster
+
+
+@receiver(results_changed)
+def broadcast_results(sender, question_id: int, **kwargs) -> None:
+    """
+    Push committed results changes to the live watchers of the question.
+    """
+    if _broadcaster is not None:
+        _broadcaster.notify(question_id)
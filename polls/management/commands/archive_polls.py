@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from polls.archive import archive_polls, restore_question
+from polls.models import PollArchive
+
+
+class Command(BaseCommand):
+    """
+    Move old closed polls out of the live tables into compressed archive
+    files, or restore archived polls.
+    """
+    help = "Archive polls closed for more than --days days, or --restore archived polls."
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument('--days', type=int, default=90,
+                            help="Archive polls closed for more than this many days (default: 90).")
+        parser.add_argument('--restore', type=int, nargs='+', metavar='QUESTION_ID',
+                            help="Restore the given archived questions instead.")
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options) -> None:
+        if options['restore']:
+            for question_id in options['restore']:
+                try:
+                    restored = restore_question(question_id)
+                except PollArchive.DoesNotExist:
+                    raise CommandError(f"Question {question_id} is not archived.")
+                self.stdout.write(self.style.SUCCESS(
+                    f"Restored {restored} rows of question {question_id}."))
+            return
+
+        archives = archive_polls(options['days'], options['chunk_size'])
+        votes = sum(archive.vote_count for archive in archives)
+        self.stdout.write(self.style.SUCCESS(f"Archived {len(archives)} polls with {votes} votes."))
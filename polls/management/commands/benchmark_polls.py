@@ -0,0 +1,87 @@
+import json
+import os
+import tempfile
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test.utils import (setup_databases, setup_test_environment,
+                               teardown_databases, teardown_test_environment)
+
+from polls.benchmarks import (SCENARIOS, compare_counter_modes, compare_database_profiles,
+                              compare_sync_async, run_benchmarks, seed_polls)
+
+
+class Command(BaseCommand):
+    """
+    Seed a throwaway database and benchmark the polls views.
+    """
+    help = "Benchmark the polls views and print latency, query and throughput figures as JSON."
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument('--questions', type=int, default=50)
+        parser.add_argument('--choices', type=int, default=4)
+        parser.add_argument('--users', type=int, default=20)
+        parser.add_argument('--requests', type=int, default=100,
+                            help="Requests per scenario.")
+        parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS),
+                            help="Scenario to run; repeat to run several (default: all).")
+        parser.add_argument('--compare-async', action='store_true',
+                            help="Also compare sync and async views under concurrent load.")
+        parser.add_argument('--concurrency', type=int, default=8,
+                            help="Concurrent clients for the --compare-* options.")
+        parser.add_argument('--compare-profiles', action='store_true',
+                            help="Also compare concurrent vote throughput across database profiles.")
+        parser.add_argument('--compare-counters', action='store_true',
+                            help="Also compare single-row and sharded vote counters on one poll.")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help="Write the JSON report to this file.")
+        parser.add_argument('--no-isolate', action='store_true',
+                            help="Seed the configured database instead of a throwaway test database.")
+
+    def handle(self, *args, **options) -> None:
+        scenarios = options['scenario'] or list(SCENARIOS)
+        isolate = not options['no_isolate']
+
+        if isolate:
+            # A file-backed test database, so concurrent clients do not run
+            # into the table locks of SQLite's shared in-memory database.
+            scratch_dir = tempfile.TemporaryDirectory()
+            for alias in connections:
+                test_settings = connections[alias].settings_dict.setdefault('TEST', {})
+                if connections[alias].vendor == 'sqlite' and not test_settings.get('NAME'):
+                    test_settings['NAME'] = os.path.join(scratch_dir.name, f'{alias}.sqlite3')
+            setup_test_environment()
+            old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            data = seed_polls(options['questions'], options['choices'],
+                              options['users'], seed=options['seed'])
+            report = {
+                'config': {key: options[key] for key in
+                           ('questions', 'choices', 'users', 'requests', 'seed')},
+                'scenarios': run_benchmarks(data, scenarios, options['requests'],
+                                            seed=options['seed']),
+            }
+            if options['compare_async']:
+                report['config']['concurrency'] = options['concurrency']
+                report['sync_vs_async'] = compare_sync_async(
+                    data, [name for name in scenarios if name != 'index'],
+                    options['requests'], options['concurrency'], seed=options['seed'])
+            if options['compare_profiles']:
+                report['config']['concurrency'] = options['concurrency']
+                report['database_profiles'] = compare_database_profiles(
+                    data, options['requests'], options['concurrency'], seed=options['seed'])
+            if options['compare_counters']:
+                report['config']['concurrency'] = options['concurrency']
+                report['counter_modes'] = compare_counter_modes(
+                    data, options['requests'], options['concurrency'], seed=options['seed'])
+        finally:
+            if isolate:
+                teardown_databases(old_config, verbosity=0)
+                teardown_test_environment()
+                scratch_dir.cleanup()
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as report_file:
+                report_file.write(output)
+        self.stdout.write(output)
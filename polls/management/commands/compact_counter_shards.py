@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from polls.models import compact_counter_shards
+
+
+class Command(BaseCommand):
+    """
+    Fold the vote counter shards of sharded questions back into the
+    stored vote counters.
+    """
+    help = "Fold the vote counter shards into the Choice and Question vote counters."
+
+    def handle(self, *args, **options) -> None:
+        moved = compact_counter_shards()
+        self.stdout.write(self.style.SUCCESS(f"Compacted {moved} votes from counter shards."))
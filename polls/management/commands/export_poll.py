@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from polls.models import Question
+from polls.streaming import EXPORT_FORMATS, iter_question_export
+
+
+class Command(BaseCommand):
+    """
+    Stream one question's results and votes out of the database.
+    """
+    help = "Export a question's results and votes as CSV or NDJSON."
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument('question_id', type=int)
+        parser.add_argument('path', nargs='?', default='-',
+                            help="File to write, or - for standard output (default).")
+        parser.add_argument('--format', choices=EXPORT_FORMATS,
+                            help="Row format (default: ndjson for .ndjson/.jsonl files, else csv).")
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options) -> None:
+        path = options['path']
+        fmt = options['format'] or ('ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv')
+        if not Question.objects.filter(pk=options['question_id']).exists():
+            raise CommandError(f"Question {options['question_id']} does not exist.")
+
+        chunks = iter_question_export(options['question_id'], fmt, options['chunk_size'])
+        if path == '-':
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+            return
+        with open(path, 'w', encoding='utf-8', newline='') as stream:
+            for chunk in chunks:
+                stream.write(chunk)
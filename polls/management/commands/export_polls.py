@@ -0,0 +1,49 @@
+import time
+from functools import partial
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand
+
+from polls.streaming import FORMATS, RecordWriter, guess_format, iter_export_records
+
+
+class Command(BaseCommand):
+    """
+    Stream every question, choice and vote out of the database.
+    """
+    help = "Export polls as a JSON fixture, NDJSON or CSV, streaming rows from the database."
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument('path', nargs='?', default='-',
+                            help="File to write, or - for standard output (default).")
+        parser.add_argument('--format', choices=FORMATS,
+                            help="Record format (default: guessed from the file name).")
+        parser.add_argument('--include-users', action='store_true',
+                            help="Also export users, including their password hashes.")
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options) -> None:
+        path = options['path']
+        fmt = options['format'] or guess_format(path)
+        started = time.perf_counter()
+
+        if path == '-':
+            writer = self.export(SimpleNamespace(write=partial(self.stdout.write, ending='')),
+                                 fmt, options)
+        else:
+            with open(path, 'w', encoding='utf-8', newline='') as stream:
+                writer = self.export(stream, fmt, options)
+
+        elapsed = time.perf_counter() - started
+        rate = round(writer.count / elapsed, 1) if elapsed else 0.0
+        self.stderr.write(f"Exported {writer.count} records in {elapsed:.3f}s ({rate} records/s).")
+
+    def export(self, stream, fmt: str, options: dict) -> RecordWriter:
+        """
+        Write every record to the stream and return the writer.
+        """
+        writer = RecordWriter(stream, fmt)
+        for record in iter_export_records(options['include_users'], options['chunk_size']):
+            writer.write(record)
+        writer.close()
+        return writer
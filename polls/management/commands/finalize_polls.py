@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from polls.results import finalize_closed_polls, prune_finalized_votes
+
+
+class Command(BaseCommand):
+    """
+    Freeze the results of closed polls, optionally deleting their votes.
+    """
+    help = "Freeze the results of closed polls into final results records."
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument('--prune-votes', action='store_true',
+                            help="Delete the Vote rows of polls with final results.")
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options) -> None:
+        finalized = finalize_closed_polls()
+        self.stdout.write(self.style.SUCCESS(f"Finalized {finalized} polls."))
+        if options['prune_votes']:
+            pruned = prune_finalized_votes(options['chunk_size'])
+            self.stdout.write(self.style.SUCCESS(f"Deleted {pruned} votes of finalized polls."))
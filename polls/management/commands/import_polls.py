@@ -0,0 +1,51 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from polls.streaming import FORMATS, PollImporter, guess_format, iter_records
+
+
+class Command(BaseCommand):
+    """
+    Stream questions, choices, votes and users from a fixture file into
+    the database in validated batches.
+    """
+    help = "Import polls from a JSON fixture, NDJSON or CSV file without loading it into memory."
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument('path', help="File to import, or - for standard input.")
+        parser.add_argument('--format', choices=FORMATS,
+                            help="Record format (default: guessed from the file name).")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options) -> None:
+        path = options['path']
+        fmt = options['format'] or guess_format(path)
+        importer = PollImporter(batch_size=options['batch_size'])
+
+        stream = sys.stdin if path == '-' else open(path, encoding='utf-8', newline='')
+        try:
+            for record in iter_records(stream, fmt):
+                importer.add(record)
+            report = importer.finish()
+        except (ValueError, KeyError) as error:
+            raise CommandError(f"Could not read {path}: {error}")
+        finally:
+            # The batches written before a failure stay committed, so their
+            # questions still need recounting.
+            importer.recount()
+            if stream is not sys.stdin:
+                stream.close()
+
+        for error in importer.errors[:20]:
+            self.stderr.write(error)
+        if len(importer.errors) > 20:
+            self.stderr.write(f"... and {len(importer.errors) - 20} more errors")
+
+        created = ", ".join(f"{count} {label}" for label, count in report['created'].items())
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {created} in {report['seconds']}s "
+            f"({report['records_per_second']} records/s); "
+            f"{sum(report['existing'].values())} already existed, "
+            f"{report['errors']} invalid, {report['skipped']} skipped."
+        ))
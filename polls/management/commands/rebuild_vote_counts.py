@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from polls.models import rebuild_vote_counts
+
+
+class Command(BaseCommand):
+    """
+    Recompute the stored vote counters of every Choice and Question
+    from the Vote table.
+    """
+    help = "Rebuild the denormalized vote counters from the Vote table."
+
+    def handle(self, *args, **options) -> None:
+        rebuild_vote_counts()
+        self.stdout.write(self.style.SUCCESS("Vote counters rebuilt."))
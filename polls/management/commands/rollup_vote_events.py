@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+
+from polls.models import VoteRollup
+from polls.trends import rollup_vote_events
+
+
+class Command(BaseCommand):
+    """
+    Aggregate the vote event log into per-minute and per-hour buckets.
+    """
+    help = "Roll up vote events into per-minute and per-hour buckets per choice."
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument('--granularity', action='append',
+                            choices=[VoteRollup.MINUTE, VoteRollup.HOUR],
+                            help="Granularity to roll up; repeat for both (default: both).")
+        parser.add_argument('--since', help="Recompute the buckets from this ISO 8601 time.")
+        parser.add_argument('--rebuild', action='store_true',
+                            help="Recompute every bucket from the whole event log.")
+
+    def handle(self, *args, **options) -> None:
+        since = None
+        if options['since']:
+            since = parse_datetime(options['since'])
+            if since is None:
+                raise CommandError(f"Invalid --since time: {options['since']}")
+
+        for granularity in options['granularity'] or [VoteRollup.MINUTE, VoteRollup.HOUR]:
+            written = rollup_vote_events(granularity, since=since, rebuild=options['rebuild'])
+            self.stdout.write(self.style.SUCCESS(
+                f"Rolled up {written} {granularity} buckets."))
@@ -0,0 +1,42 @@
+# Generated by Django 5.0.14 on 2026-10-17 07:10
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_vote_counts(apps, schema_editor):
+    Choice = apps.get_model('polls', 'Choice')
+    Question = apps.get_model('polls', 'Question')
+    Vote = apps.get_model('polls', 'Vote')
+
+    choice_votes = Vote.objects.filter(
+        choice=OuterRef('pk')
+    ).order_by().values('choice').annotate(total=Count('pk')).values('total')
+    question_votes = Vote.objects.filter(
+        choice__question=OuterRef('pk')
+    ).order_by().values('choice__question').annotate(total=Count('pk')).values('total')
+
+    Choice.objects.update(vote_count=Coalesce(Subquery(choice_votes), Value(0)))
+    Question.objects.update(vote_count=Coalesce(Subquery(question_votes), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='choice',
+            name='vote_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='vote_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_vote_counts, migrations.RunPython.noop),
+    ]
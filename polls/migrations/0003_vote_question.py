@@ -0,0 +1,66 @@
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def populate_vote_question(apps, schema_editor):
+    """
+    Copy each vote's question from its choice, keep only the latest vote
+    of a user per question, and recount the vote counters.
+    """
+    Choice = apps.get_model('polls', 'Choice')
+    Question = apps.get_model('polls', 'Question')
+    Vote = apps.get_model('polls', 'Vote')
+
+    Vote.objects.update(question=Subquery(
+        Choice.objects.filter(pk=OuterRef('choice')).values('question')[:1]
+    ))
+
+    duplicates = Vote.objects.values('user', 'question').annotate(
+        latest=Max('pk'), total=Count('pk')
+    ).filter(total__gt=1)
+    for duplicate in duplicates:
+        Vote.objects.filter(
+            user=duplicate['user'], question=duplicate['question']
+        ).exclude(pk=duplicate['latest']).delete()
+
+    choice_votes = Vote.objects.filter(
+        choice=OuterRef('pk')
+    ).order_by().values('choice').annotate(total=Count('pk')).values('total')
+    question_votes = Vote.objects.filter(
+        question=OuterRef('pk')
+    ).order_by().values('question').annotate(total=Count('pk')).values('total')
+    Choice.objects.update(vote_count=Coalesce(Subquery(choice_votes), Value(0)))
+    Question.objects.update(vote_count=Coalesce(Subquery(question_votes), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('polls', '0002_vote_counts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vote',
+            name='question',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='polls.question'),
+        ),
+        migrations.RunPython(populate_vote_question, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='vote',
+            name='question',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='polls.question'),
+        ),
+        migrations.AddConstraint(
+            model_name='vote',
+            constraint=models.UniqueConstraint(fields=('user', 'question'), name='unique_vote_per_user_question'),
+        ),
+        migrations.AddIndex(
+            model_name='vote',
+            index=models.Index(fields=['question', 'choice'], name='vote_question_choice_idx'),
+        ),
+    ]
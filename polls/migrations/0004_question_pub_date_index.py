@@ -0,0 +1,17 @@
+# Generated by Django 5.0.14 on 2026-10-17 07:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0003_vote_question'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['pub_date', 'id'], name='question_pub_date_id_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-17 07:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0004_question_pub_date_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='last_vote_at',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-17 07:27
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0005_question_last_vote_at'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='choice',
+            constraint=models.UniqueConstraint(models.F('question'), django.db.models.functions.text.Lower('choice_text'), name='unique_choice_text_per_question'),
+        ),
+    ]
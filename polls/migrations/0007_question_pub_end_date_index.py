@@ -0,0 +1,17 @@
+# Generated by Django 5.0.14 on 2026-10-17 07:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0006_choice_text_unique'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['pub_date', 'end_date'], name='question_pub_end_date_idx'),
+        ),
+    ]
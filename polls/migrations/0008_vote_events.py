@@ -0,0 +1,50 @@
+# Generated by Django 5.0.14 on 2026-10-17 07:54
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0007_question_pub_end_date_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VoteEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('new_choice', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='polls.choice')),
+                ('old_choice', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='polls.choice')),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='polls.question')),
+                ('user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['created_at'], name='vote_event_created_at_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='VoteRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('minute', 'Minute'), ('hour', 'Hour')], max_length=6)),
+                ('bucket_start', models.DateTimeField()),
+                ('gained', models.PositiveIntegerField(default=0)),
+                ('lost', models.PositiveIntegerField(default=0)),
+                ('choice', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='polls.choice')),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='polls.question')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['question', 'granularity', 'bucket_start'], name='vote_rollup_question_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='voterollup',
+            constraint=models.UniqueConstraint(fields=('choice', 'granularity', 'bucket_start'), name='unique_vote_rollup_bucket'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.0.14 on 2026-10-17 07:59
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0008_vote_events'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='sharded_counters',
+            field=models.BooleanField(default=False, help_text='Count votes in several counter rows per choice, for polls with heavy concurrent voting.'),
+        ),
+        migrations.CreateModel(
+            name='ChoiceCounterShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.PositiveSmallIntegerField()),
+                ('count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('choice', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='polls.choice')),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='polls.question')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='choicecountershard',
+            constraint=models.UniqueConstraint(fields=('choice', 'shard'), name='unique_counter_shard'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.0.14 on 2026-10-17 08:17
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0009_counter_shards'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FinalResults',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('finalized_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('total_votes', models.PositiveIntegerField()),
+                ('last_vote_at', models.DateTimeField(null=True)),
+                ('choices', models.JSONField(help_text='The id, choice_text, votes and percentage of each choice.')),
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='final_results', to='polls.question')),
+            ],
+            options={
+                'verbose_name_plural': 'final results',
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.0.14 on 2026-10-17 08:21
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0010_final_results'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PollArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('path', models.CharField(max_length=500)),
+                ('choice_count', models.PositiveIntegerField()),
+                ('vote_count', models.PositiveIntegerField()),
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='archive', to='polls.question')),
+            ],
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.0.14 on 2026-10-17 08:58
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0011_poll_archive'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='choice',
+            name='unique_choice_text_per_question',
+        ),
+        migrations.AddConstraint(
+            model_name='choice',
+            constraint=models.UniqueConstraint(models.F('question'), django.db.models.functions.text.Lower('choice_text'), name='unique_choice_text_per_question', violation_error_message='Choice with this text already exists.'),
+        ),
+    ]
@@ -1,8 +1,13 @@
 import datetime
+from collections import Counter
 
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import IntegrityError, connections, models, router, transaction
+from django.db.models import Case, Count, F, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, Greatest, Lower
 from django.http import HttpRequest
 from django.utils import timezone
 
@@ -14,6 +19,79 @@ def now_plus(added_day: int = 0) -> datetime:
     return timezone.now() + timezone.timedelta(days=added_day)
 
 
+class QuestionQuerySet(models.QuerySet):
+    """
+    Time-window filters and status annotations for questions.
+
+    Every method takes an optional 'now'; pass the same value to each call
+    of a chain so the whole query is evaluated against one moment.
+    """
+    def published(self, now: datetime = None) -> 'QuestionQuerySet':
+        """
+        Questions whose pub_date has passed, whether open or closed.
+        """
+        return self.filter(pub_date__lte=now or timezone.now())
+
+    def open(self, now: datetime = None) -> 'QuestionQuerySet':
+        """
+        Questions that can currently be voted on.
+        """
+        now = now or timezone.now()
+        return self.filter(pub_date__lte=now, end_date__gte=now)
+
+    def closed(self, now: datetime = None) -> 'QuestionQuerySet':
+        """
+        Published questions whose end_date has passed.
+        """
+        now = now or timezone.now()
+        return self.filter(pub_date__lte=now, end_date__lt=now)
+
+    def recent(self, now: datetime = None) -> 'QuestionQuerySet':
+        """
+        Questions published within the last 24 hours.
+        """
+        now = now or timezone.now()
+        return self.filter(pub_date__gte=now - timezone.timedelta(days=1), pub_date__lte=now)
+
+    def with_vote_totals(self) -> 'QuestionQuerySet':
+        """
+        Annotate 'total_votes', which get_all_votes() then returns: the
+        final total of finalized questions, otherwise the stored counter
+        plus the votes still held in counter shards.
+        """
+        pending = ChoiceCounterShard.objects.filter(
+            question=OuterRef('pk')
+        ).order_by().values('question').annotate(total=Sum('count')).values('total')
+        return self.annotate(total_votes=Coalesce(
+            'final_results__total_votes', F('vote_count') + Coalesce(Subquery(pending), 0)))
+
+    def with_status(self, now: datetime = None) -> 'QuestionQuerySet':
+        """
+        Annotate 'is_open', 'is_recent' and 'remaining_time' in SQL, which
+        is_published(), was_published_recently() and get_remaining_time()
+        then use instead of calling timezone.now() per row.
+        """
+        now = now or timezone.now()
+        return self.annotate(
+            is_open=Case(
+                When(pub_date__lte=now, end_date__gte=now, then=Value(True)),
+                default=Value(False),
+                output_field=models.BooleanField(),
+            ),
+            is_recent=Case(
+                When(pub_date__gte=now - timezone.timedelta(days=1), pub_date__lte=now,
+                     then=Value(True)),
+                default=Value(False),
+                output_field=models.BooleanField(),
+            ),
+            remaining_time=Case(
+                When(end_date__gt=now, then=F('end_date') - Value(now)),
+                default=Value(timezone.timedelta(0)),
+                output_field=models.DurationField(),
+            ),
+        )
+
+
 class Question(models.Model):
     """
     Model representing a poll question.
@@ -38,13 +116,31 @@ class Question(models.Model):
                                     verbose_name='published date')
     end_date = models.DateTimeField(default=end_date_default,
                                     verbose_name='end date')
+    vote_count = models.PositiveIntegerField(default=0, editable=False)
+    last_vote_at = models.DateTimeField(null=True, editable=False)
+    sharded_counters = models.BooleanField(
+        default=False,
+        help_text="Count votes in several counter rows per choice, for polls "
+                  "with heavy concurrent voting.")
+
+    objects = QuestionQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['pub_date', 'id'], name='question_pub_date_id_idx'),
+            models.Index(fields=['pub_date', 'end_date'], name='question_pub_end_date_idx'),
+        ]
 
     def clean(self) -> None:
         """
-        Custom validation to ensure pub_date is earlier than end_date.
+        Custom validation to ensure pub_date is earlier than end_date and
+        that a poll with final results is not reopened.
         """
         if self.pub_date >= self.end_date:
             raise ValidationError("The 'published date' must be earlier than the 'end date'.")
+        if (self.pk and self.end_date > timezone.now()
+                and FinalResults.objects.filter(question_id=self.pk).exists()):
+            raise ValidationError("The results of this poll are final; it cannot be reopened.")
 
     def save(self, *args, **kwargs) -> None:
         """
@@ -56,30 +152,42 @@ class Question(models.Model):
     def was_published_recently(self) -> bool:
         """
         Check if the question was published within the last 24 hours.
+        Uses the 'is_recent' annotation when the question was loaded from
+        an annotated queryset.
 
         Returns:
             bool: True if the question was published recently, False otherwise.
         """
+        if hasattr(self, 'is_recent'):
+            return self.is_recent
         return now_plus(-1) <= self.pub_date <= now_plus(0)
 
     def is_published(self) -> bool:
         """
         Check if the question is currently published.
+        Uses the 'is_open' annotation when the question was loaded from
+        an annotated queryset.
 
         Returns:
             bool: True if the question is published, False otherwise.
         """
+        if hasattr(self, 'is_open'):
+            return self.is_open
         return self.pub_date <= now_plus(0) <= self.end_date
 
     def get_remaining_time(self) -> str:
         """
         Return the time remaining (time difference) until a poll ends.
         If a poll has ended, it will return zero time difference.
+        Uses the 'remaining_time' annotation when present.
 
         Returns:
             str: The remaining time as formatted string without microseconds.
         """
-        remaining_time = max(self.end_date - now_plus(0), timezone.timedelta(0))
+        if hasattr(self, 'remaining_time'):
+            remaining_time = self.remaining_time
+        else:
+            remaining_time = max(self.end_date - now_plus(0), timezone.timedelta(0))
         return str(remaining_time).split(".")[0]
 
     def get_all_votes(self) -> int:
@@ -87,11 +195,12 @@ class Question(models.Model):
         Get the total number of votes for this question.
 
         Returns:
-            int: The total number of votes.
+            int: The total number of votes (read from the stored counter,
+            or the 'total_votes' annotation, which adds uncompacted counter shards).
         """
-        related_choices = Choice.objects.filter(question=self)
-        all_votes = Vote.objects.filter(choice__in=related_choices).count()
-        return all_votes
+        if hasattr(self, 'total_votes'):
+            return self.total_votes
+        return self.vote_count
 
     def __str__(self) -> str:
         """
@@ -109,6 +218,14 @@ class Choice(models.Model):
     """
     question = models.ForeignKey(Question, on_delete=models.CASCADE)
     choice_text = models.CharField(max_length=200)
+    vote_count = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint('question', Lower('choice_text'),
+                                    name='unique_choice_text_per_question',
+                                    violation_error_message="Choice with this text already exists."),
+        ]
 
     @property
     def votes(self) -> int:
@@ -116,27 +233,22 @@ class Choice(models.Model):
         Get the number of votes for this choice.
 
         Returns:
-            int: The number of votes.
-        """
-        return self.vote_set.count()
-
-    def clean(self) -> None:
-        """
-        Custom validation to ensure that the choice_text is unique among existing choices.
-        Raises a ValidationError if the choice_text is not unique.
+            int: The number of votes (read from the stored counter).
         """
-        text_exists = Choice.objects.filter(question=self.question,
-                                            choice_text__iexact=self.choice_text).exists()
-
-        if text_exists:
-            raise ValidationError("Choice with this text already exists.")
+        return self.vote_count
 
     def save(self, *args, **kwargs) -> None:
         """
-        Override the save method to ensure clean() is called before saving.
+        Save the choice. Uniqueness of the choice_text is enforced by the
+        database constraint; a violation is raised as a ValidationError.
         """
-        self.clean()
-        super().save(*args, **kwargs)
+        try:
+            with transaction.atomic():
+                super().save(*args, **kwargs)
+        except IntegrityError as error:
+            if 'unique_choice_text_per_question' in str(error):
+                raise ValidationError("Choice with this text already exists.")
+            raise
 
     def get_percentage_vote(self) -> float:
         """
@@ -148,7 +260,7 @@ class Choice(models.Model):
         all_votes = self.question.get_all_votes()
         if all_votes == 0:
             return 0
-        
+
         return (self.votes / all_votes) * 100
 
     def __str__(self) -> str:
@@ -161,6 +273,57 @@ class Choice(models.Model):
         return self.choice_text
 
 
+def find_duplicate_choices(choices: list) -> list:
+    """
+    Find the choices whose text (ignoring case) is already used by another
+    choice of the same question, either in the database or earlier in the
+    list. All questions are checked with a single query.
+
+    Args:
+        choices (list): Unsaved or modified Choice instances.
+
+    Returns:
+        list: The duplicate choices, in list order.
+    """
+    question_ids = {choice.question_id for choice in choices}
+    own_ids = [choice.pk for choice in choices if choice.pk is not None]
+    taken = set(Choice.objects.filter(
+        question_id__in=question_ids
+    ).exclude(pk__in=own_ids).values_list('question_id', Lower('choice_text')))
+
+    duplicates = []
+    for choice in choices:
+        key = (choice.question_id, choice.choice_text.lower())
+        if key in taken:
+            duplicates.append(choice)
+        taken.add(key)
+    return duplicates
+
+
+def validate_choices(choices: list) -> None:
+    """
+    Validate the uniqueness of many choice texts with a single query.
+
+    Raises:
+        ValidationError: If any choice text is already used in its question.
+    """
+    duplicates = find_duplicate_choices(choices)
+    if duplicates:
+        raise ValidationError([
+            ValidationError("Choice with this text already exists: %(text)s",
+                            params={'text': choice.choice_text})
+            for choice in duplicates
+        ])
+
+
+async def aget_request_user(request: HttpRequest) -> User:
+    """
+    Return request.user, loading it from the session off the event loop.
+    """
+    await sync_to_async(lambda: request.user.is_authenticated)()
+    return request.user
+
+
 class AuthorizedUser(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
 
@@ -189,55 +352,436 @@ class AuthorizedUser(models.Model):
             Vote: The existing vote of the user for the question, or None if no vote exists.
         """
         existing_vote = Vote.objects.filter(user=request.user,
-                                        choice__question=question).first()
+                                            question=question).first()
         return existing_vote
 
     def submit_vote(self, request: HttpRequest, question: Question) -> None:
         """
         Submit a vote for the user on a given question.
+        The vote is written as a single upsert on (user, question), so
+        concurrent submissions cannot create duplicate votes. The vote is
+        always written, even if the user's cached vote map already shows the
+        same choice, as that map may be stale in this process. The
+        validated vote is cast through the vote store selected by
+        settings.VOTE_STORE (see polls/votestore.py); the default store
+        writes it here, or hands it to the batching vote ingestor when
+        settings.VOTE_INGEST_MODE is 'queued'.
 
         Args:
             request (HttpRequest): The HTTP request object.
             question (Question): The question to vote on.
+
+        Raises:
+            Choice.DoesNotExist: If the choice does not belong to the question.
         """
         if self.can_vote(request, question):
-            new_choice = Choice.objects.get(pk=request.POST["choice"])
-            existing_vote = self.get_existing_vote(request, question)
+            from .votestore import get_vote_store
+            new_choice = Choice.objects.get(pk=request.POST["choice"],
+                                            question=question)
+            get_vote_store().cast(request.user, question, new_choice)
+
+    async def acan_vote(self, request: HttpRequest, question: Question) -> bool:
+        """
+        Async version of can_vote(). Loads request.user without blocking
+        the event loop.
+        """
+        user = await aget_request_user(request)
+        return question.is_published() and user.is_authenticated
+
+    async def asubmit_vote(self, request: HttpRequest, question: Question) -> None:
+        """
+        Async version of submit_vote(), built on the ORM's async API.
+
+        Raises:
+            Choice.DoesNotExist: If the choice does not belong to the question.
+        """
+        if await self.acan_vote(request, question):
+            from .votestore import get_vote_store
+            new_choice = await Choice.objects.aget(pk=request.POST["choice"],
+                                                   question=question)
+            await get_vote_store().acast(request.user, question, new_choice)
+
+
+class Vote(models.Model):
+    """
+    Records a Vote.
+
+    A user has at most one vote per question, enforced by a unique
+    constraint on (user, question). Saving or deleting a vote, including
+    deletes cascading from its user, keeps the denormalized 'vote_count'
+    columns of its Choice and Question up to date with atomic, database-side
+    updates, and appends a VoteEvent in the same transaction. Bulk inserts
+    and updates bypass this; run the 'rebuild_vote_counts' management
+    command afterwards.
+    """
+    question = models.ForeignKey(Question, on_delete=models.CASCADE)
+    choice = models.ForeignKey(Choice, on_delete=models.CASCADE)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'question'],
+                                    name='unique_vote_per_user_question'),
+        ]
+        indexes = [
+            models.Index(fields=['question', 'choice'],
+                         name='vote_question_choice_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values) -> 'Vote':
+        """
+        Remember the choice a vote was loaded with, so that save() can tell
+        when the vote moves to another choice.
+        """
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_choice_id = instance.__dict__.get('choice_id')
+        return instance
+
+    def save(self, *args, **kwargs) -> None:
+        """
+        Save the vote and adjust the vote counters of the affected choices.
+        The question defaults to the question of the chosen choice.
+        """
+        if self.question_id is None:
+            self.question_id = self.choice.question_id
 
-            if existing_vote is None:
-                new_vote = Vote(user=request.user, choice=new_choice)
-                new_vote.save()
-            else:
-                existing_vote.choice = new_choice
-                existing_vote.save()
+        adding = self._state.adding
+        loaded_choice_id = getattr(self, '_loaded_choice_id', None)
 
-            self.update_session(request, question)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding:
+                self._adjust_counts(self.choice_id, +1, question_delta=+1)
+                self._log_event(None, self.choice_id)
+            elif loaded_choice_id is not None and loaded_choice_id != self.choice_id:
+                self._adjust_counts(loaded_choice_id, -1)
+                self._adjust_counts(self.choice_id, +1, question_delta=0)
+                self._log_event(loaded_choice_id, self.choice_id)
 
-    def update_session(self, request: HttpRequest, question: Question) -> None:
+        self._loaded_choice_id = self.choice_id
+
+    def record_deletion(self, keep_user: bool = True) -> None:
         """
-        Update the session with the user's recent question and choice.
+        Decrement the vote counters of the deleted vote's choice and append
+        a VoteEvent recording its removal. Called by the post_delete
+        receiver in polls/signals.py, so votes deleted by cascade, e.g.
+        with their user, are counted too.
 
         Args:
-            request (HttpRequest): The HTTP request object.
-            question (Question): The question that the user voted on.
+            keep_user (bool): Record the voter on the event; False when the
+                user is being deleted along with the vote.
         """
-        recent_question_ids = request.session.get('recent_question_ids', [])
-        recent_choice_ids = request.session.get('recent_choice_ids', [])
+        self._adjust_counts(self.choice_id, -1, question_delta=-1)
+        self._log_event(self.choice_id, None, keep_user)
 
-        try:
-            index = recent_question_ids.index(question.id)
-            recent_choice_ids[index] = int(request.POST["choice"])
-        except ValueError:
-            recent_question_ids.append(int(question.id))
-            recent_choice_ids.append(int(request.POST["choice"]))
+    def _uses_sharded_counters(self) -> bool:
+        """
+        Return whether the vote's question counts votes in counter shards,
+        reading the flag from a cached question when there is one.
+        """
+        question = None
+        if Vote._meta.get_field('question').is_cached(self):
+            question = self.question
+        elif (Vote._meta.get_field('choice').is_cached(self)
+              and Choice._meta.get_field('question').is_cached(self.choice)):
+            question = self.choice.question
+        if question is not None and question.pk == self.question_id:
+            return question.sharded_counters
+        return Question.objects.filter(pk=self.question_id, sharded_counters=True).exists()
 
-        request.session['recent_question_ids'] = recent_question_ids
-        request.session['recent_choice_ids'] = recent_choice_ids
+    def _log_event(self, old_choice_id: int | None, new_choice_id: int | None,
+                   keep_user: bool = True) -> None:
+        """
+        Append a VoteEvent recording this vote's change of choice, without
+        its user when keep_user is False.
+        """
+        VoteEvent.objects.create(user_id=self.user_id if keep_user else None,
+                                 question_id=self.question_id,
+                                 old_choice_id=old_choice_id, new_choice_id=new_choice_id)
 
+    def _adjust_counts(self, choice_id: int, delta: int, question_delta: int = None) -> None:
+        """
+        Atomically add delta to the counter of a choice. When question_delta
+        is given, also add it to the counter of the vote's question and stamp
+        the question's 'last_vote_at'. The cached Choice and Question
+        instances (if any) are updated too, so callers holding them see the
+        new counts without a refresh. For questions with sharded counters,
+        delta goes to one of the choice's counter shards instead, and the
+        question's total follows from the sum of its shards.
 
-class Vote(models.Model):
+        Args:
+            choice_id (int): The choice whose counter changes.
+            delta (int): The amount to add to the choice (negative to subtract).
+            question_delta (int): The amount to add to the question, if any.
+        """
+        if self._uses_sharded_counters():
+            ChoiceCounterShard.add(choice_id, self.question_id, self.user_id, delta)
+            return
+
+        Choice.objects.filter(pk=choice_id).update(
+            vote_count=F('vote_count') + delta)
+        if question_delta is not None:
+            Question.objects.filter(pk=self.question_id).update(
+                vote_count=F('vote_count') + question_delta,
+                last_vote_at=timezone.now())
+
+        choice_field = Vote._meta.get_field('choice')
+        if not choice_field.is_cached(self) or self.choice.pk != choice_id:
+            return
+        self.choice.vote_count += delta
+        if question_delta and Choice._meta.get_field('question').is_cached(self.choice):
+            self.choice.question.vote_count += question_delta
+
+
+class ChoiceCounterShard(models.Model):
     """
-    Records a Vote.
+    One of several counter rows holding votes of a choice whose question has
+    'sharded_counters' set, so concurrent voters update different rows
+    instead of serializing on the Choice and Question rows.
+
+    A choice's total is its 'vote_count' plus the sum of its shards, and
+    compact_counter_shards() periodically folds the shards into 'vote_count'.
     """
     choice = models.ForeignKey(Choice, on_delete=models.CASCADE)
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    question = models.ForeignKey(Question, on_delete=models.CASCADE)
+    shard = models.PositiveSmallIntegerField()
+    count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['choice', 'shard'], name='unique_counter_shard'),
+        ]
+
+    @classmethod
+    def add(cls, choice_id: int, question_id: int, user_id: int, delta: int) -> None:
+        """
+        Add delta to the shard of a choice picked by the voter's id, creating
+        the choice's shards on first use.
+        """
+        shard = user_id % settings.VOTE_COUNTER_SHARDS
+        shards = cls.objects.filter(choice_id=choice_id, shard=shard)
+        changes = {'count': F('count') + delta, 'updated_at': timezone.now()}
+        if not shards.update(**changes):
+            cls.objects.bulk_create([
+                cls(choice_id=choice_id, question_id=question_id, shard=index)
+                for index in range(settings.VOTE_COUNTER_SHARDS)
+            ], ignore_conflicts=True)
+            shards.update(**changes)
+
+
+def compact_counter_shards() -> int:
+    """
+    Fold the counter shards into the 'vote_count' columns of their choices
+    and questions and stamp the questions' 'last_vote_at'. Shards are
+    decremented by the amounts read rather than reset, so votes counted
+    while compacting are kept.
+
+    Returns:
+        int: The number of votes moved out of the shards.
+    """
+    moved = 0
+    choice_totals = Counter()
+    question_totals = Counter()
+    last_vote_at = {}
+    with transaction.atomic():
+        shards = ChoiceCounterShard.objects.select_for_update().exclude(count=0).values(
+            'pk', 'choice_id', 'question_id', 'count', 'updated_at')
+        for shard in shards:
+            choice_totals[shard['choice_id']] += shard['count']
+            question_totals[shard['question_id']] += shard['count']
+            last_vote_at[shard['question_id']] = max(
+                last_vote_at.get(shard['question_id'], shard['updated_at']), shard['updated_at'])
+            ChoiceCounterShard.objects.filter(pk=shard['pk']).update(
+                count=F('count') - shard['count'])
+            moved += abs(shard['count'])
+
+        for choice_id, total in choice_totals.items():
+            Choice.objects.filter(pk=choice_id).update(vote_count=F('vote_count') + total)
+        for question_id, total in question_totals.items():
+            stamp = Value(last_vote_at[question_id])
+            Question.objects.filter(pk=question_id).update(
+                vote_count=F('vote_count') + total,
+                last_vote_at=Coalesce(Greatest('last_vote_at', stamp), stamp))
+    return moved
+
+
+class FinalResults(models.Model):
+    """
+    The frozen results of a closed question: the total and each choice's
+    votes and percentage when it was finalized.
+
+    Results are finalized once, by the first results snapshot built after
+    the question's end date (plus settings.FINAL_RESULTS_GRACE_PERIOD) or
+    by the 'finalize_polls' management command, and are never updated.
+    """
+    question = models.OneToOneField(Question, on_delete=models.CASCADE,
+                                    related_name='final_results')
+    finalized_at = models.DateTimeField(default=timezone.now)
+    total_votes = models.PositiveIntegerField()
+    last_vote_at = models.DateTimeField(null=True)
+    choices = models.JSONField(help_text="The id, choice_text, votes and percentage "
+                                         "of each choice.")
+
+    class Meta:
+        verbose_name_plural = 'final results'
+
+    def save(self, *args, **kwargs) -> None:
+        """
+        Save new final results. Existing results cannot be changed.
+
+        Raises:
+            ValueError: If the results have already been saved.
+        """
+        if not self._state.adding:
+            raise ValueError("Final results cannot be changed.")
+        super().save(*args, **kwargs)
+
+
+class PollArchive(models.Model):
+    """
+    The summary left behind when the 'archive_polls' command moves a closed
+    question's choices, votes and vote history into a compressed archive
+    file. The question and its FinalResults stay, so the poll list and the
+    results page still show its totals.
+    """
+    question = models.OneToOneField(Question, on_delete=models.CASCADE,
+                                    related_name='archive')
+    archived_at = models.DateTimeField(default=timezone.now)
+    path = models.CharField(max_length=500)
+    choice_count = models.PositiveIntegerField()
+    vote_count = models.PositiveIntegerField()
+
+
+class VoteEvent(models.Model):
+    """
+    An append-only record of a vote being cast, changed or removed.
+
+    'old_choice' is empty for a new vote and 'new_choice' is empty for a
+    removed vote. Events are never updated; the 'rollup_vote_events'
+    management command aggregates them into VoteRollup buckets.
+    """
+    created_at = models.DateTimeField(default=timezone.now)
+    user = models.ForeignKey(User, null=True, on_delete=models.SET_NULL)
+    question = models.ForeignKey(Question, on_delete=models.CASCADE)
+    old_choice = models.ForeignKey(Choice, null=True, on_delete=models.SET_NULL,
+                                   related_name='+')
+    new_choice = models.ForeignKey(Choice, null=True, on_delete=models.SET_NULL,
+                                   related_name='+')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at'], name='vote_event_created_at_idx'),
+        ]
+
+    def save(self, *args, **kwargs) -> None:
+        """
+        Save a new event. Existing events cannot be changed.
+
+        Raises:
+            ValueError: If the event has already been saved.
+        """
+        if not self._state.adding:
+            raise ValueError("Vote events are append-only.")
+        super().save(*args, **kwargs)
+
+
+class VoteRollup(models.Model):
+    """
+    The votes a choice gained and lost within one minute or hour, as
+    aggregated from VoteEvent rows.
+    """
+    MINUTE = 'minute'
+    HOUR = 'hour'
+    GRANULARITY_CHOICES = [(MINUTE, 'Minute'), (HOUR, 'Hour')]
+
+    question = models.ForeignKey(Question, on_delete=models.CASCADE)
+    choice = models.ForeignKey(Choice, on_delete=models.CASCADE)
+    granularity = models.CharField(max_length=6, choices=GRANULARITY_CHOICES)
+    bucket_start = models.DateTimeField()
+    gained = models.PositiveIntegerField(default=0)
+    lost = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['choice', 'granularity', 'bucket_start'],
+                                    name='unique_vote_rollup_bucket'),
+        ]
+        indexes = [
+            models.Index(fields=['question', 'granularity', 'bucket_start'],
+                         name='vote_rollup_question_idx'),
+        ]
+
+    @property
+    def net(self) -> int:
+        """
+        Return the change in the choice's votes over the bucket.
+        """
+        return self.gained - self.lost
+
+
+def rebuild_vote_counts(question_ids=None) -> None:
+    """
+    Recompute the denormalized 'vote_count' columns of every Choice and
+    Question from the Vote table, using one UPDATE statement per model,
+    and empty the counter shards. Finalized questions are left alone, as
+    their votes may have been pruned.
+
+    Args:
+        question_ids: Only rebuild the counters of these questions, if given.
+    """
+    choice_votes = Vote.objects.filter(
+        choice=OuterRef('pk')
+    ).order_by().values('choice').annotate(total=Count('pk')).values('total')
+    question_votes = Vote.objects.filter(
+        question=OuterRef('pk')
+    ).order_by().values('question').annotate(total=Count('pk')).values('total')
+
+    questions = Question.objects.all()
+    if question_ids is not None:
+        questions = questions.filter(pk__in=question_ids)
+
+    with transaction.atomic():
+        Choice.objects.filter(question__in=questions, question__final_results__isnull=True).update(
+            vote_count=Coalesce(Subquery(choice_votes), Value(0)))
+        questions.filter(final_results__isnull=True).update(
+            vote_count=Coalesce(Subquery(question_votes), Value(0)))
+        ChoiceCounterShard.objects.filter(question__in=questions).update(count=0)
+
+
+def delete_in_chunks(queryset, chunk_size: int, before_delete=None) -> int:
+    """
+    Delete the rows of a queryset a chunk at a time with plain DELETE ...
+    WHERE pk IN (...) statements run through a cursor on the primary
+    database. The per-row delete signals and cascades are skipped, so
+    callers delete dependent rows first, adjust any counters and invalidate
+    the caches themselves, once rather than per row.
+
+    Args:
+        queryset (QuerySet): The rows to delete.
+        chunk_size (int): Rows deleted per query.
+        before_delete (callable): Called with the queryset of each chunk
+            before it is deleted.
+
+    Returns:
+        int: The number of rows deleted.
+    """
+    model = queryset.model
+    database = router.db_for_write(model)
+    connection = connections[database]
+    table = connection.ops.quote_name(model._meta.db_table)
+    column = connection.ops.quote_name(model._meta.pk.column)
+    queryset = queryset.using(database).order_by('pk')
+
+    deleted = 0
+    while True:
+        pks = list(queryset.values_list('pk', flat=True)[:chunk_size])
+        if not pks:
+            return deleted
+        if before_delete is not None:
+            before_delete(model.objects.using(database).filter(pk__in=pks))
+        placeholders = ', '.join(['%s'] * len(pks))
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {table} WHERE {column} IN ({placeholders})', pks)
+            deleted += cursor.rowcount
@@ -0,0 +1,53 @@
+"""
+Keyset (seek) pagination for the poll index.
+
+Pages are ordered by (pub_date, id) descending. A cursor encodes the
+(pub_date, id) of the last question on a page, and the next page starts
+right after it, so deep pages cost the same as the first one.
+"""
+import base64
+import datetime
+
+from django.db.models import Q
+from django.db.models.query import QuerySet
+
+
+def encode_cursor(pub_date: datetime.datetime, pk: int) -> str:
+    """
+    Encode the position of a question as an opaque, URL-safe cursor.
+    """
+    raw = f'{pub_date.isoformat()}|{pk}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """
+    Decode a cursor produced by encode_cursor().
+
+    Returns:
+        tuple: The (pub_date, id) position the cursor points at.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        pub_date, pk = base64.urlsafe_b64decode(padded).decode().split('|')
+        return datetime.datetime.fromisoformat(pub_date), int(pk)
+    except (TypeError, UnicodeDecodeError, base64.binascii.Error) as error:
+        raise ValueError("Invalid cursor") from error
+
+
+def seek(queryset: QuerySet, cursor: str = None) -> QuerySet:
+    """
+    Order a queryset by (pub_date, id) descending and, given a cursor,
+    keep only the rows that come after it.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    queryset = queryset.order_by('-pub_date', '-id')
+    if cursor:
+        pub_date, pk = decode_cursor(cursor)
+        queryset = queryset.filter(Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, id__lt=pk))
+    return queryset
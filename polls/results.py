@@ -0,0 +1,260 @@
+"""
+Precomputed results snapshots for poll questions.
+
+A snapshot holds everything the results page needs (the question fields,
+per-choice counts and percentages, and the total) in Django's cache
+framework, so repeated views of a popular poll do not touch the database.
+Snapshots are invalidated whenever a vote, choice or question changes.
+The vote counts come from the vote store when it holds the votes itself
+(see polls/votestore.py), and from the database counters otherwise.
+
+Once a poll has been closed for settings.FINAL_RESULTS_GRACE_PERIOD
+seconds, the next snapshot built freezes its results into a FinalResults
+record, and every later snapshot is read from that record alone.
+"""
+import datetime
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Max, Sum
+from django.dispatch import Signal
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+
+from mysite.instrumentation import record_cache_access
+from mysite.routers import use_primary
+from .fragments import bump_question_version
+from .models import (Choice, ChoiceCounterShard, FinalResults, Question, Vote,
+                     delete_in_chunks)
+
+# Sent once a transaction that changed a question's results has committed.
+results_changed = Signal()
+
+
+def results_cache_key(question_id: int) -> str:
+    """
+    Return the cache key of the results snapshot for a question.
+    """
+    return f'polls:results:{question_id}'
+
+
+@use_primary()
+def build_results_snapshot(question_id: int) -> dict:
+    """
+    Compute the results snapshot of a question from the primary database,
+    including the votes still held in counter shards, or with the counts
+    held by the vote store. The snapshot of a finalized question is read
+    from its FinalResults, and a question closed for longer than the grace
+    period is finalized here.
+
+    Args:
+        question_id (int): The primary key of the question.
+
+    Returns:
+        dict: The question fields, the per-choice results, the total votes
+        and whether the results are 'final'.
+
+    Raises:
+        Question.DoesNotExist: If there is no such question.
+    """
+    from .votestore import get_vote_store
+    question = Question.objects.values(
+        'id', 'question_text', 'pub_date', 'end_date', 'vote_count', 'last_vote_at',
+        final_total=F('final_results__total_votes'), final_choices=F('final_results__choices'),
+        final_last_vote_at=F('final_results__last_vote_at'),
+    ).get(pk=question_id)
+    final = {key: question.pop(f'final_{key}') for key in ('total', 'choices', 'last_vote_at')}
+    if final['total'] is not None:
+        question.update(vote_count=final['total'], last_vote_at=final['last_vote_at'])
+        return {
+            'question': question,
+            'choices': final['choices'],
+            'total_votes': final['total'],
+            'final': True,
+        }
+
+    choices = list(Choice.objects.filter(question_id=question_id).order_by('pk').values(
+        'id', 'choice_text', 'vote_count'
+    ))
+    counts = get_vote_store().get_counts(question_id)
+    if counts is not None:
+        for choice in choices:
+            choice['vote_count'] = counts.get(choice['id'], 0)
+        question['vote_count'] = sum(choice['vote_count'] for choice in choices)
+        pending = {}
+    else:
+        pending = {
+            shard['choice_id']: shard
+            for shard in ChoiceCounterShard.objects.filter(question_id=question_id).values(
+                'choice_id').annotate(total=Sum('count'), last=Max('updated_at')).order_by()
+        }
+    if pending:
+        # Votes counted in shards that have not been compacted yet
+        question['vote_count'] += sum(shard['total'] for shard in pending.values())
+        last_shard_update = max(shard['last'] for shard in pending.values())
+        if question['last_vote_at'] is None or question['last_vote_at'] < last_shard_update:
+            question['last_vote_at'] = last_shard_update
+
+    total_votes = question['vote_count']
+    results = []
+    for choice in choices:
+        votes = choice['vote_count'] + pending.get(choice['id'], {}).get('total', 0)
+        percentage = (votes / total_votes) * 100 if total_votes else 0
+        results.append({
+            'id': choice['id'],
+            'choice_text': choice['choice_text'],
+            'votes': votes,
+            'percentage': percentage,
+        })
+
+    snapshot = {
+        'question': question,
+        'choices': results,
+        'total_votes': total_votes,
+        'final': False,
+    }
+    grace = datetime.timedelta(seconds=settings.FINAL_RESULTS_GRACE_PERIOD)
+    if question['end_date'] + grace < timezone.now():
+        return freeze_results(snapshot)
+    return snapshot
+
+
+def freeze_results(snapshot: dict) -> dict:
+    """
+    Write the FinalResults of a closed question from its snapshot, unless
+    they were written concurrently, and give the question a new fragment
+    version.
+
+    Returns:
+        dict: The snapshot, marked final.
+    """
+    question = snapshot['question']
+    FinalResults.objects.bulk_create([FinalResults(
+        question_id=question['id'],
+        total_votes=snapshot['total_votes'],
+        last_vote_at=question['last_vote_at'],
+        choices=snapshot['choices'],
+    )], ignore_conflicts=True)
+    bump_question_version(question['id'])
+    return {**snapshot, 'final': True}
+
+
+def finalize_closed_polls() -> int:
+    """
+    Finalize the results of every question closed for longer than
+    settings.FINAL_RESULTS_GRACE_PERIOD that has not been finalized yet.
+    Safe to run repeatedly.
+
+    Returns:
+        int: The number of questions finalized.
+    """
+    cutoff = timezone.now() - datetime.timedelta(seconds=settings.FINAL_RESULTS_GRACE_PERIOD)
+    pending = list(Question.objects.closed(cutoff).filter(
+        final_results__isnull=True).values_list('pk', flat=True))
+    for question_id in pending:
+        build_results_snapshot(question_id)
+        invalidate_results_snapshot(question_id)
+    return len(pending)
+
+
+def prune_finalized_votes(chunk_size: int = 2000) -> int:
+    """
+    Delete the Vote rows of finalized questions, whose results no longer
+    depend on them. Their vote counters and vote events are kept.
+
+    Votes are deleted in chunks without the per-vote signals; the voters'
+    vote maps are dropped once per chunk and each question's caches once.
+
+    Args:
+        chunk_size (int): Votes deleted per query.
+
+    Returns:
+        int: The number of votes deleted.
+    """
+    from .votemap import invalidate_many_user_votes
+
+    question_ids = list(Question.objects.filter(
+        final_results__isnull=False, vote__isnull=False).distinct().values_list('pk', flat=True))
+    deleted = 0
+    for question_id in question_ids:
+        deleted += delete_in_chunks(Vote.objects.filter(question_id=question_id), chunk_size,
+                                    lambda votes: invalidate_many_user_votes(
+                                        votes.values_list('user_id', flat=True)))
+        invalidate_results_snapshot(question_id)
+        bump_question_version(question_id)
+    return deleted
+
+
+def snapshot_timeout(snapshot: dict):
+    """
+    Return how long to cache a snapshot: final results never change.
+    """
+    return None if snapshot['final'] else settings.RESULTS_CACHE_TIMEOUT
+
+
+def patch_final_results_headers(response: HttpResponse, public: bool) -> None:
+    """
+    Let clients keep a response showing final results for
+    settings.FINAL_RESULTS_MAX_AGE seconds.
+
+    Args:
+        response (HttpResponse): The response to patch.
+        public (bool): Whether shared caches may keep it too, i.e. the
+            response is the same for every user.
+    """
+    visibility = {'public': True} if public else {'private': True}
+    patch_cache_control(response, max_age=settings.FINAL_RESULTS_MAX_AGE, **visibility)
+
+
+def get_results_snapshot(question_id: int) -> dict:
+    """
+    Return the results snapshot of a question, computing and caching it
+    on a cache miss.
+
+    Raises:
+        Question.DoesNotExist: If there is no such question.
+    """
+    key = results_cache_key(question_id)
+    snapshot = cache.get(key)
+    record_cache_access(snapshot is not None)
+    if snapshot is None:
+        snapshot = build_results_snapshot(question_id)
+        cache.set(key, snapshot, snapshot_timeout(snapshot))
+    return snapshot
+
+
+async def aget_results_snapshot(question_id: int) -> dict:
+    """
+    Async version of get_results_snapshot(), using the async cache API.
+
+    Raises:
+        Question.DoesNotExist: If there is no such question.
+    """
+    key = results_cache_key(question_id)
+    snapshot = await cache.aget(key)
+    record_cache_access(snapshot is not None)
+    if snapshot is None:
+        snapshot = await sync_to_async(build_results_snapshot)(question_id)
+        await cache.aset(key, snapshot, snapshot_timeout(snapshot))
+    return snapshot
+
+
+def invalidate_results_snapshot(question_id: int) -> None:
+    """
+    Drop the cached results snapshot of a question.
+
+    The key is deleted right away and again once the current transaction
+    commits, so a reader racing the write cannot leave a stale snapshot
+    behind. The results_changed signal is sent after the commit.
+    """
+    key = results_cache_key(question_id)
+    cache.delete(key)
+
+    def committed() -> None:
+        cache.delete(key)
+        results_changed.send(sender=Question, question_id=question_id)
+
+    transaction.on_commit(committed)
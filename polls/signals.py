@@ -0,0 +1,96 @@
+from django.contrib.auth.models import User
+from django.db.models import F, QuerySet, Subquery
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .fragments import bump_question_version
+from .models import Choice, Question, Vote
+from .results import invalidate_results_snapshot
+from .votemap import invalidate_user_votes
+from .votestore import get_vote_store
+
+
+@receiver([post_save, post_delete], sender=Question)
+def question_changed(sender, instance: Question, **kwargs) -> None:
+    """
+    Invalidate the results snapshot and cached fragments when a question
+    is saved or deleted.
+    """
+    invalidate_results_snapshot(instance.pk)
+    bump_question_version(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Choice)
+def choice_changed(sender, instance: Choice, **kwargs) -> None:
+    """
+    Invalidate the results snapshot and cached fragments when one of its
+    choices changes.
+    """
+    invalidate_results_snapshot(instance.question_id)
+    bump_question_version(instance.question_id)
+
+
+def deleted_with(origin, model) -> bool:
+    """
+    Return whether a delete started from an instance or queryset of a model.
+
+    Args:
+        origin: The 'origin' of a pre_delete or post_delete signal.
+        model: The model class, or a tuple of them, to check for.
+    """
+    if isinstance(origin, QuerySet):
+        return issubclass(origin.model, model)
+    return isinstance(origin, model)
+
+
+@receiver(pre_delete, sender=Choice)
+def choice_deleting(sender, instance: Choice, origin=None, **kwargs) -> None:
+    """
+    Take the votes counted on a choice about to be deleted off its
+    question's counter. Its votes are then deleted by cascade without
+    being counted one by one.
+    """
+    if deleted_with(origin, Question):
+        return
+    Question.objects.filter(pk=instance.question_id).update(
+        vote_count=F('vote_count') - Subquery(
+            Choice.objects.filter(pk=instance.pk).values('vote_count')))
+
+
+@receiver(post_delete, sender=Vote)
+def vote_removed(sender, instance: Vote, origin=None, **kwargs) -> None:
+    """
+    Decrement the vote counters of a deleted vote, whether it was deleted
+    directly or by cascade from its user. Votes deleted with their choice
+    or question are left to choice_deleting() or go with the question.
+    """
+    if deleted_with(origin, (Choice, Question)):
+        return
+    instance.record_deletion(keep_user=not deleted_with(origin, User))
+
+
+@receiver([post_save, post_delete], sender=Vote)
+def vote_changed(sender, instance: Vote, **kwargs) -> None:
+    """
+    Invalidate the results snapshot, cached fragments and the voter's vote
+    map when a vote is cast, changed or removed.
+    """
+    invalidate_results_snapshot(instance.question_id)
+    bump_question_version(instance.question_id)
+    invalidate_user_votes(instance.user_id)
+
+
+@receiver(post_save, sender=Vote)
+def vote_saved(sender, instance: Vote, **kwargs) -> None:
+    """
+    Pass a vote saved outside the vote store on to the store.
+    """
+    get_vote_store().absorb(instance.user_id, instance.question_id, instance.choice_id)
+
+
+@receiver(post_delete, sender=Vote)
+def vote_deleted(sender, instance: Vote, **kwargs) -> None:
+    """
+    Drop a deleted vote from the vote store.
+    """
+    get_vote_store().discard(instance.user_id, instance.question_id)
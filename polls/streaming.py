@@ -0,0 +1,517 @@
+"""
+Streaming import and export of polls.
+
+Records use Django's fixture layout ({"model": ..., "pk": ..., "fields":
+{...}}) and are read and written one at a time in three formats:
+
+* json   -- a fixture array, as produced by dumpdata and read by loaddata,
+            parsed incrementally so large files never sit in memory;
+* ndjson -- one fixture record per line;
+* csv    -- one record per row, with a column per field.
+
+PollImporter validates records in batches and writes them with
+bulk_create inside chunked transactions.
+
+iter_question_export() streams one question's results and raw votes as
+CSV or NDJSON rows for staff exports, reading the votes with
+values_list().iterator() so memory stays flat however many there are.
+"""
+import csv
+import json
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.color import no_style
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Choice, Question, Vote, find_duplicate_choices, rebuild_vote_counts
+from .results import get_results_snapshot, invalidate_results_snapshot
+
+FORMATS = ('json', 'ndjson', 'csv')
+
+# The fields read and written for each model, in dependency order.
+MODEL_FIELDS = {
+    'auth.user': ['username', 'password', 'first_name', 'last_name', 'email',
+                  'is_staff', 'is_active', 'is_superuser', 'last_login', 'date_joined'],
+    'polls.question': ['question_text', 'pub_date', 'end_date'],
+    'polls.choice': ['question', 'choice_text'],
+    'polls.vote': ['question', 'choice', 'user'],
+}
+
+# The unique fields, besides the primary key, of the models whose rows
+# may already exist when importing.
+UNIQUE_FIELDS = {
+    'auth.user': ['username'],
+    'polls.vote': ['user_id', 'question_id'],
+}
+
+CSV_COLUMNS = ['model', 'pk'] + list(dict.fromkeys(
+    field for fields in MODEL_FIELDS.values() for field in fields
+))
+
+
+def guess_format(path: str) -> str:
+    """
+    Guess the record format from a file name, defaulting to json.
+    """
+    if path.endswith(('.ndjson', '.jsonl')):
+        return 'ndjson'
+    if path.endswith('.csv'):
+        return 'csv'
+    return 'json'
+
+
+def iter_json_array(stream, chunk_size: int = 65536):
+    """
+    Yield the items of a JSON array read incrementally from a text stream.
+
+    Raises:
+        ValueError: If the stream is not a well-formed JSON array.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    started = False
+    eof = False
+
+    while True:
+        while position < len(buffer) and buffer[position].isspace():
+            position += 1
+
+        if position == len(buffer):
+            if eof:
+                raise ValueError("Unexpected end of JSON array")
+            chunk = stream.read(chunk_size)
+            eof = not chunk
+            buffer, position = buffer[position:] + chunk, 0
+            continue
+
+        if not started:
+            if buffer[position] != '[':
+                raise ValueError("Expected a JSON array")
+            started = True
+            position += 1
+        elif buffer[position] == ']':
+            return
+        elif buffer[position] == ',':
+            position += 1
+        else:
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise ValueError("Malformed JSON array")
+                chunk = stream.read(chunk_size)
+                eof = not chunk
+                buffer, position = buffer[position:] + chunk, 0
+                continue
+            yield item
+            if position > chunk_size:
+                buffer, position = buffer[position:], 0
+
+
+def iter_records(stream, fmt: str):
+    """
+    Yield fixture records from a text stream in the given format.
+    """
+    if fmt == 'json':
+        yield from iter_json_array(stream)
+    elif fmt == 'ndjson':
+        for line in stream:
+            if line.strip():
+                yield json.loads(line)
+    elif fmt == 'csv':
+        for row in csv.DictReader(stream):
+            model = row['model']
+            yield {
+                'model': model,
+                'pk': int(row['pk']) if row['pk'] else None,
+                'fields': {field: row[field] for field in MODEL_FIELDS.get(model, [])
+                           if row.get(field) not in (None, '')},
+            }
+    else:
+        raise ValueError(f"Unknown format: {fmt}")
+
+
+class RecordWriter:
+    """
+    Write fixture records to a text stream one at a time.
+    """
+    def __init__(self, stream, fmt: str) -> None:
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown format: {fmt}")
+        self.stream = stream
+        self.fmt = fmt
+        self.count = 0
+        if fmt == 'csv':
+            self._csv = csv.DictWriter(stream, fieldnames=CSV_COLUMNS)
+            self._csv.writeheader()
+        elif fmt == 'json':
+            stream.write('[')
+
+    def write(self, record: dict) -> None:
+        if self.fmt == 'csv':
+            self._csv.writerow({'model': record['model'], 'pk': record['pk'],
+                                **record['fields']})
+        else:
+            data = json.dumps(record, cls=DjangoJSONEncoder)
+            if self.fmt == 'json':
+                self.stream.write((',\n' if self.count else '\n') + data)
+            else:
+                self.stream.write(data + '\n')
+        self.count += 1
+
+    def close(self) -> None:
+        if self.fmt == 'json':
+            self.stream.write('\n]\n')
+
+
+def iter_export_records(include_users: bool = False, chunk_size: int = 2000):
+    """
+    Yield fixture records for every question, choice and vote (and
+    optionally user), streaming rows from the database in chunks.
+    """
+    models = [(Question, 'polls.question'), (Choice, 'polls.choice'), (Vote, 'polls.vote')]
+    if include_users:
+        models.insert(0, (User, 'auth.user'))
+
+    for model, label in models:
+        columns = [model._meta.get_field(field).attname for field in MODEL_FIELDS[label]]
+        rows = model.objects.order_by('pk').values_list('pk', *columns)
+        for row in rows.iterator(chunk_size=chunk_size):
+            yield {'model': label, 'pk': row[0],
+                   'fields': dict(zip(MODEL_FIELDS[label], row[1:]))}
+
+
+EXPORT_FORMATS = ('csv', 'ndjson')
+
+EXPORT_CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+# Columns of a question export; result rows leave the vote columns empty
+# and vote rows the result columns.
+EXPORT_COLUMNS = ['record', 'choice_id', 'choice_text', 'votes', 'percentage',
+                  'vote_id', 'user_id', 'username']
+
+
+class _Echo:
+    """
+    A file-like object handing back what is written to it, so csv.writer
+    can format one row at a time.
+    """
+    def write(self, value: str) -> str:
+        return value
+
+
+def iter_question_export(question_id: int, fmt: str, chunk_size: int = 2000):
+    """
+    Yield a question's per-choice results followed by its votes as CSV or
+    NDJSON text, one chunk of rows at a time. The CSV header is yielded
+    before anything is read from the database.
+
+    Args:
+        question_id (int): The primary key of the question.
+        fmt (str): 'csv' or 'ndjson'.
+        chunk_size (int): Votes read per query and written per chunk.
+
+    Raises:
+        ValueError: If the format is unknown.
+        Question.DoesNotExist: If there is no such question.
+    """
+    if fmt == 'csv':
+        writer = csv.writer(_Echo())
+        yield writer.writerow(EXPORT_COLUMNS)
+
+        def encode(row: dict) -> str:
+            return writer.writerow([row.get(column, '') for column in EXPORT_COLUMNS])
+    elif fmt == 'ndjson':
+        def encode(row: dict) -> str:
+            return json.dumps(row, cls=DjangoJSONEncoder) + '\n'
+    else:
+        raise ValueError(f"Unknown format: {fmt}")
+
+    snapshot = get_results_snapshot(question_id)
+    yield ''.join(encode({
+        'record': 'result',
+        'choice_id': choice['id'],
+        'choice_text': choice['choice_text'],
+        'votes': choice['votes'],
+        'percentage': round(choice['percentage'], 2),
+    }) for choice in snapshot['choices'])
+
+    votes = Vote.objects.filter(question_id=question_id).order_by('pk').values_list(
+        'pk', 'user_id', 'user__username', 'choice_id')
+    lines = []
+    for vote_id, user_id, username, choice_id in votes.iterator(chunk_size=chunk_size):
+        lines.append(encode({'record': 'vote', 'choice_id': choice_id, 'vote_id': vote_id,
+                             'user_id': user_id, 'username': username}))
+        if len(lines) >= chunk_size:
+            yield ''.join(lines)
+            lines = []
+    if lines:
+        yield ''.join(lines)
+
+
+def _as_datetime(value):
+    """
+    Parse a fixture datetime, treating naive values as the current time zone.
+    """
+    if value is None or hasattr(value, 'tzinfo'):
+        return value
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise ValueError(f"Invalid datetime: {value}")
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def _as_bool(value) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes')
+    return bool(value)
+
+
+class PollImporter:
+    """
+    Validate fixture records in batches and bulk insert them.
+
+    Records are buffered per model; once a buffer holds batch_size records,
+    every buffer is written in dependency order inside one transaction, so
+    memory stays bounded by the batch size. Invalid records are skipped
+    and counted. Rows whose primary key or unique fields already exist are
+    left untouched and counted separately, so re-importing a file creates
+    nothing.
+    """
+    def __init__(self, batch_size: int = 1000) -> None:
+        self.batch_size = batch_size
+        self.buffers = {label: [] for label in MODEL_FIELDS}
+        self.created = {label: 0 for label in MODEL_FIELDS}
+        self.existing = {label: 0 for label in MODEL_FIELDS}
+        self.errors = []
+        self.skipped = 0
+        self.touched_questions = set()
+        self.imported_questions = set()
+        self.started = time.perf_counter()
+
+    def add(self, record: dict) -> None:
+        """
+        Buffer one record, writing the buffers once a batch is full.
+        """
+        if not isinstance(record, dict):
+            self.errors.append(f"{record!r}: Not a fixture record.")
+            return
+        label = record.get('model')
+        if label not in self.buffers:
+            self.skipped += 1
+            return
+        self.buffers[label].append(record)
+        if len(self.buffers[label]) >= self.batch_size:
+            self.flush()
+
+    def finish(self) -> dict:
+        """
+        Write the remaining records, recount the votes of the imported
+        questions and return a report.
+        """
+        self.flush()
+        self.recount()
+
+        elapsed = time.perf_counter() - self.started
+        total = sum(self.created.values())
+        return {
+            'created': self.created,
+            'existing': self.existing,
+            'skipped': self.skipped,
+            'errors': len(self.errors),
+            'seconds': round(elapsed, 3),
+            'records_per_second': round(total / elapsed, 1) if elapsed else 0.0,
+        }
+
+    def recount(self) -> None:
+        """
+        Recount the votes of the questions written since the last recount
+        and reset the primary key sequences.
+
+        Every batch commits on its own, so call this after a failed import
+        too, to keep the counters of the batches already written right.
+        """
+        if self.imported_questions:
+            rebuild_vote_counts(self.imported_questions)
+            self.imported_questions.clear()
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), [User, Question, Choice, Vote]):
+                cursor.execute(sql)
+
+    def flush(self) -> None:
+        """
+        Validate and write every buffered record in one transaction.
+        """
+        with transaction.atomic():
+            for label, build in (('auth.user', self._build_users),
+                                 ('polls.question', self._build_questions),
+                                 ('polls.choice', self._build_choices),
+                                 ('polls.vote', self._build_votes)):
+                records, self.buffers[label] = self.buffers[label], []
+                if not records:
+                    continue
+                objects = self._new_objects(label, build(records))
+                if objects:
+                    type(objects[0]).objects.bulk_create(objects, ignore_conflicts=True)
+                    self.created[label] += len(objects)
+
+            for question_id in self.touched_questions:
+                invalidate_results_snapshot(question_id)
+            self.imported_questions |= self.touched_questions
+            self.touched_questions.clear()
+
+    def _new_objects(self, label: str, objects: list) -> list:
+        """
+        Return the objects whose primary key and unique fields are not taken
+        yet, in the database or earlier in the batch, counting the others as
+        existing. One query checks the primary keys and one the unique fields.
+        """
+        if not objects:
+            return objects
+        model = type(objects[0])
+        taken_pks = set(model.objects.filter(
+            pk__in=[obj.pk for obj in objects if obj.pk is not None]).values_list('pk', flat=True))
+        fields = UNIQUE_FIELDS.get(label, [])
+        taken_keys = set()
+        if fields:
+            lookups = {f'{field}__in': {getattr(obj, field) for obj in objects} for field in fields}
+            taken_keys = set(model.objects.filter(**lookups).values_list(*fields))
+
+        new = []
+        for obj in objects:
+            key = tuple(getattr(obj, field) for field in fields)
+            if obj.pk in taken_pks or (fields and key in taken_keys):
+                self.existing[label] += 1
+                continue
+            if obj.pk is not None:
+                taken_pks.add(obj.pk)
+            taken_keys.add(key)
+            new.append(obj)
+        return new
+
+    def _error(self, record: dict, message: str) -> None:
+        self.errors.append(f"{record.get('model')} {record.get('pk')}: {message}")
+
+    def _build_users(self, records: list) -> list:
+        users = []
+        for record in records:
+            try:
+                fields = record['fields']
+                users.append(User(
+                    pk=record.get('pk'),
+                    username=fields['username'],
+                    password=fields.get('password', ''),
+                    first_name=fields.get('first_name', ''),
+                    last_name=fields.get('last_name', ''),
+                    email=fields.get('email', ''),
+                    is_staff=_as_bool(fields.get('is_staff', False)),
+                    is_active=_as_bool(fields.get('is_active', True)),
+                    is_superuser=_as_bool(fields.get('is_superuser', False)),
+                    last_login=_as_datetime(fields.get('last_login')),
+                    date_joined=_as_datetime(fields.get('date_joined')) or timezone.now(),
+                ))
+            except (KeyError, TypeError, ValueError, AttributeError) as error:
+                self._error(record, str(error))
+        return users
+
+    def _build_questions(self, records: list) -> list:
+        questions = []
+        for record in records:
+            try:
+                fields = record['fields']
+                question = Question(pk=record.get('pk'),
+                                    question_text=fields['question_text'])
+                if fields.get('pub_date'):
+                    question.pub_date = _as_datetime(fields['pub_date'])
+                if fields.get('end_date'):
+                    question.end_date = _as_datetime(fields['end_date'])
+            except (KeyError, TypeError, ValueError, AttributeError) as error:
+                self._error(record, str(error))
+                continue
+            if question.pub_date >= question.end_date:
+                self._error(record, "The 'published date' must be earlier than the 'end date'.")
+                continue
+            if question.pk is not None:
+                self.touched_questions.add(question.pk)
+            questions.append(question)
+        return questions
+
+    def _build_choices(self, records: list) -> list:
+        question_ids = set()
+        for record in records:
+            try:
+                question_ids.add(int(record['fields']['question']))
+            except (KeyError, TypeError, ValueError):
+                pass
+        # One query for the questions and one for the existing choice texts
+        known_questions = set(Question.objects.filter(pk__in=question_ids).values_list(
+            'pk', flat=True))
+
+        choices = {}
+        for record in records:
+            try:
+                fields = record['fields']
+                choice = Choice(pk=record.get('pk'), question_id=int(fields['question']),
+                                choice_text=fields['choice_text'])
+            except (KeyError, TypeError, ValueError) as error:
+                self._error(record, str(error))
+                continue
+            if choice.question_id not in known_questions:
+                self._error(record, "Unknown question.")
+                continue
+            choices[id(choice)] = (record, choice)
+
+        for choice in find_duplicate_choices([choice for _, choice in choices.values()]):
+            record, _ = choices.pop(id(choice))
+            self._error(record, "Choice with this text already exists.")
+
+        for _, choice in choices.values():
+            self.touched_questions.add(choice.question_id)
+        return [choice for _, choice in choices.values()]
+
+    def _build_votes(self, records: list) -> list:
+        choice_ids = set()
+        user_ids = set()
+        for record in records:
+            try:
+                choice_ids.add(int(record['fields']['choice']))
+                user_ids.add(int(record['fields']['user']))
+            except (KeyError, TypeError, ValueError):
+                pass
+        # One query to map the batch's choices to their questions, one for the users
+        choice_questions = dict(Choice.objects.filter(pk__in=choice_ids).values_list(
+            'pk', 'question_id'))
+        known_users = set(User.objects.filter(pk__in=user_ids).values_list('pk', flat=True))
+
+        votes = {}
+        for record in records:
+            try:
+                fields = record['fields']
+                choice_id = int(fields['choice'])
+                user_id = int(fields['user'])
+                question_id = choice_questions.get(choice_id)
+                claimed_question_id = int(fields.get('question') or question_id or 0)
+            except (KeyError, TypeError, ValueError, AttributeError) as error:
+                self._error(record, str(error))
+                continue
+            if question_id is None or claimed_question_id != question_id:
+                self._error(record, "The choice does not belong to a known question.")
+                continue
+            if user_id not in known_users:
+                self._error(record, "Unknown user.")
+                continue
+            self.touched_questions.add(question_id)
+            # A later vote of the same user on the same question wins
+            votes[(user_id, question_id)] = Vote(pk=record.get('pk'), user_id=user_id,
+                                                 question_id=question_id, choice_id=choice_id)
+        return list(votes.values())
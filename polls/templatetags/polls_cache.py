@@ -0,0 +1,15 @@
+from django import template
+
+from polls.fragments import get_question_version
+
+register = template.Library()
+
+
+@register.simple_tag
+def question_version(question_id: int) -> int:
+    """
+    Return the version of a question, for keying its cached fragments.
+
+    Usage: {% question_version question.pk as version %}
+    """
+    return get_question_version(question_id)
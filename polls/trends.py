@@ -0,0 +1,157 @@
+"""
+Vote trends.
+
+rollup_vote_events() aggregates the append-only VoteEvent log into
+per-minute or per-hour VoteRollup buckets per choice, with one grouped
+query for the votes gained and one for the votes lost. get_vote_trend()
+reads a question's rollups for the trend table on the results page, so
+the page never scans raw events.
+"""
+import datetime
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max
+from django.db.models.functions import Trunc
+from django.utils import timezone
+
+from mysite.instrumentation import record_cache_access
+from mysite.routers import use_primary
+
+from .models import VoteEvent, VoteRollup
+
+
+def truncate(moment: datetime.datetime, granularity: str) -> datetime.datetime:
+    """
+    Return the start of the minute or hour bucket holding a moment, in the
+    current time zone like the database-side Trunc().
+    """
+    moment = timezone.localtime(moment).replace(second=0, microsecond=0)
+    if granularity == VoteRollup.HOUR:
+        moment = moment.replace(minute=0)
+    return moment
+
+
+def count_by_bucket(events, choice_field: str, granularity: str) -> list:
+    """
+    Count events per (bucket, question, choice), grouping on choice_field.
+    """
+    return events.filter(**{f'{choice_field}__isnull': False}).annotate(
+        bucket=Trunc('created_at', granularity)
+    ).values('bucket', 'question_id', choice_field).annotate(total=Count('pk')).order_by()
+
+
+def rollup_vote_events(granularity: str, since: datetime.datetime = None,
+                       rebuild: bool = False) -> int:
+    """
+    Recompute the rollup buckets of one granularity from a moment onwards.
+
+    By default the rollup resumes at the last bucket already written, which
+    may have been incomplete when it was rolled up, so running it
+    repeatedly is cheap and idempotent.
+
+    Args:
+        granularity (str): VoteRollup.MINUTE or VoteRollup.HOUR.
+        since (datetime): Recompute the buckets from the one holding this moment.
+        rebuild (bool): Recompute every bucket from the whole event log.
+
+    Returns:
+        int: The number of buckets written.
+    """
+    rollups = VoteRollup.objects.filter(granularity=granularity)
+    if rebuild:
+        since = None
+    elif since is None:
+        since = rollups.aggregate(last=Max('bucket_start'))['last']
+    else:
+        since = truncate(since, granularity)
+
+    events = VoteEvent.objects.all()
+    if since is not None:
+        events = events.filter(created_at__gte=since)
+        rollups = rollups.filter(bucket_start__gte=since)
+
+    buckets = {}
+    for choice_field, column in (('new_choice_id', 'gained'), ('old_choice_id', 'lost')):
+        for row in count_by_bucket(events, choice_field, granularity):
+            key = (row['bucket'], row['question_id'], row[choice_field])
+            buckets.setdefault(key, {'gained': 0, 'lost': 0})[column] = row['total']
+
+    with transaction.atomic():
+        question_ids = set(rollups.values_list('question_id', flat=True))
+        rollups.delete()
+        VoteRollup.objects.bulk_create([
+            VoteRollup(bucket_start=bucket, question_id=question_id, choice_id=choice_id,
+                       granularity=granularity, **counts)
+            for (bucket, question_id, choice_id), counts in buckets.items()
+        ])
+
+    question_ids.update(question_id for _, question_id, _ in buckets)
+    cache.delete_many([vote_trend_cache_key(question_id, granularity)
+                       for question_id in question_ids])
+    return len(buckets)
+
+
+def vote_trend_cache_key(question_id: int, granularity: str) -> str:
+    """
+    Return the cache key of a question's vote trend.
+    """
+    return f'polls:trend:{granularity}:{question_id}'
+
+
+@use_primary()
+def build_vote_trend(question_id: int, granularity: str, buckets: int) -> dict:
+    """
+    Read the latest rollup buckets of a question from the primary database.
+
+    Args:
+        question_id (int): The primary key of the question.
+        granularity (str): VoteRollup.MINUTE or VoteRollup.HOUR.
+        buckets (int): The number of most recent buckets to include.
+
+    Returns:
+        dict: The 'granularity', the bucket start times ('buckets', oldest
+        first) and one row per choice with its net votes per bucket ('rows').
+    """
+    rollups = VoteRollup.objects.filter(question_id=question_id, granularity=granularity)
+    starts = sorted(rollups.order_by('-bucket_start').values_list(
+        'bucket_start', flat=True).distinct()[:buckets])
+    if not starts:
+        return {'granularity': granularity, 'buckets': [], 'rows': []}
+
+    positions = {start: index for index, start in enumerate(starts)}
+    rows = {}
+    for rollup in rollups.filter(bucket_start__gte=starts[0]).order_by('choice_id').values(
+            'choice_id', 'choice__choice_text', 'bucket_start', 'gained', 'lost'):
+        row = rows.setdefault(rollup['choice_id'], {
+            'choice_id': rollup['choice_id'],
+            'choice_text': rollup['choice__choice_text'],
+            'net': [0] * len(starts),
+        })
+        row['net'][positions[rollup['bucket_start']]] = rollup['gained'] - rollup['lost']
+    return {'granularity': granularity, 'buckets': starts, 'rows': list(rows.values())}
+
+
+def get_vote_trend(question_id: int) -> dict:
+    """
+    Return the vote trend shown on a question's results page, with the
+    granularity and number of buckets set by settings.VOTE_TREND_GRANULARITY
+    and VOTE_TREND_BUCKETS, building and caching it on a cache miss.
+    """
+    granularity = settings.VOTE_TREND_GRANULARITY
+    key = vote_trend_cache_key(question_id, granularity)
+    trend = cache.get(key)
+    record_cache_access(trend is not None)
+    if trend is None:
+        trend = build_vote_trend(question_id, granularity, settings.VOTE_TREND_BUCKETS)
+        cache.set(key, trend, settings.RESULTS_CACHE_TIMEOUT)
+    return trend
+
+
+async def aget_vote_trend(question_id: int) -> dict:
+    """
+    Async version of get_vote_trend().
+    """
+    return await sync_to_async(get_vote_trend)(question_id)
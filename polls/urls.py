@@ -1,12 +1,30 @@
+from django.conf import settings
 from django.urls import path
 
-from . import views
+from . import api, async_views, views
 
 app_name = 'polls'
 
-urlpatterns = [
-    path('', views.IndexView.as_view(), name='index'),
-    path('<int:pk>/', views.DetailView.as_view(), name='detail'),
-    path('<int:pk>/results/', views.ResultsView.as_view(), name='results'),
-    path('<int:question_id>/vote/', views.vote, name='vote'),
-]
+
+def get_urlpatterns(async_views_enabled: bool = False) -> list:
+    """
+    Return the polls URL patterns, using the async detail, results and
+    vote views when async_views_enabled is True.
+    """
+    source = async_views if async_views_enabled else views
+    return [
+        path('', views.IndexView.as_view(), name='index'),
+        path('<int:pk>/', source.DetailView.as_view(), name='detail'),
+        path('<int:pk>/results/', source.ResultsView.as_view(), name='results'),
+        path('<int:pk>/results/stream/', views.results_stream, name='results_stream'),
+        path('<int:question_id>/vote/', source.vote, name='vote'),
+        path('<int:question_id>/export/', views.export_question, name='export'),
+        path('api/questions/', api.question_list, name='api_question_list'),
+        path('api/questions/<int:question_id>/', api.question_detail, name='api_question_detail'),
+        path('api/questions/<int:question_id>/results/', api.question_results,
+             name='api_question_results'),
+        path('api/questions/<int:question_id>/vote/', api.question_vote, name='api_question_vote'),
+    ]
+
+
+urlpatterns = get_urlpatterns(settings.POLLS_ASYNC_VIEWS)
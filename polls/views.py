@@ -1,34 +1,111 @@
+from django.conf import settings
 from django.contrib import messages
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth import login, authenticate
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.forms import UserCreationForm
-
+from django.core.cache import cache
 from django.db.models.query import QuerySet
 from django.http import Http404, HttpRequest, \
-                        HttpResponse, HttpResponseRedirect
+                        HttpResponse, HttpResponseRedirect, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
 from django.utils import timezone
 from django.views import generic
 
+from mysite.instrumentation import record_cache_access
+
+from .fragments import get_question_versions, index_page_cache_key
+from .live import format_event, get_broadcaster
 from .models import AuthorizedUser, Choice, Question
+from .pagination import encode_cursor, seek
+from .results import get_results_snapshot, patch_final_results_headers
+from .streaming import EXPORT_CONTENT_TYPES, EXPORT_FORMATS, iter_question_export
+from .trends import get_vote_trend
+from .votemap import get_request_votes
 
 
 class IndexView(generic.ListView):
     """
-    View for displaying a list of the latest poll questions.
+    View for displaying a list of the latest poll questions, one page at
+    a time. Pages are keyset paginated on (pub_date, id) and linked with
+    a "cursor" query parameter.
     """
     template_name = 'polls/index.html'
     context_object_name = 'latest_question_list'
+    statuses = ['open', 'closed', 'all']
 
     def get_queryset(self) -> QuerySet[Question]:
         """
-        Return all the published questions (not including those set to be
-        published in the future).
+        Return the open, closed or all published questions (as selected by
+        the "status" query parameter, open by default) after the requested
+        cursor, annotated with their status in SQL so a page loads in a
+        single query.
+        """
+        now = timezone.now()
+        status = self.get_status()
+        questions = Question.objects.with_status(now).with_vote_totals()
+        if status == 'open':
+            questions = questions.open(now)
+        elif status == 'closed':
+            questions = questions.closed(now)
+        else:
+            questions = questions.published(now)
+        try:
+            return seek(questions, self.request.GET.get('cursor'))
+        except ValueError:
+            raise Http404("Invalid page cursor")
+
+    def get_status(self) -> str:
+        """
+        Return the requested status filter: 'open', 'closed' or 'all'.
+        """
+        status = self.request.GET.get('status', 'open')
+        if status not in self.statuses:
+            raise Http404("Invalid poll status")
+        return status
+
+    def get(self, request, *args, **kwargs) -> HttpResponse:
+        """
+        Serve anonymous visitors from a short-lived cache of the whole page.
+        Pages with pending messages are neither served from nor stored in it.
+        """
+        if request.user.is_authenticated or len(messages.get_messages(request)):
+            return super().get(request, *args, **kwargs)
+
+        key = index_page_cache_key(request)
+        content = cache.get(key)
+        record_cache_access(content is not None)
+        if content is None:
+            response = super().get(request, *args, **kwargs)
+            response.render()
+            cache.set(key, response.content, settings.INDEX_PAGE_CACHE_TIMEOUT)
+            return response
+        return HttpResponse(content)
+
+    def get_context_data(self, **kwargs) -> dict:
+        """
+        Fetch one page plus one row, to know whether there is a next page,
+        mark the questions the user has voted on and look up the versions
+        keying their cached rows.
         """
-        return Question.objects.filter(
-            pub_date__lte=timezone.now()
-        ).order_by('-pub_date')
+        page_size = settings.POLLS_PER_PAGE
+        page = list(self.object_list[:page_size + 1])
+        votes = get_request_votes(self.request)
+        versions = get_question_versions([question.id for question in page])
+        for question in page:
+            question.voted_choice_id = votes.get(question.id)
+            question.cache_version = versions[question.id]
+        context = super().get_context_data(object_list=page[:page_size], **kwargs)
+
+        context['next_cursor'] = None
+        if len(page) > page_size:
+            last = page[page_size - 1]
+            context['next_cursor'] = encode_cursor(last.pub_date, last.pk)
+        context['is_first_page'] = not self.request.GET.get('cursor')
+        context['status'] = self.get_status()
+        context['statuses'] = self.statuses
+        return context
 
 
 class DetailView(generic.DetailView):
@@ -40,9 +117,16 @@ class DetailView(generic.DetailView):
 
     def get_queryset(self) -> QuerySet[Question]:
         """
-        Excludes any questions that aren't published yet.
+        Excludes any questions that aren't published yet and annotates
+        their status for the poll info.
         """
-        return Question.objects.filter(pub_date__lte=timezone.now())
+        now = timezone.now()
+        return Question.objects.published(now).with_status(now)
+
+    def get_context_data(self, **kwargs) -> dict:
+        context = super().get_context_data(**kwargs)
+        context['voted_choice_id'] = get_request_votes(self.request).get(self.object.id)
+        return context
 
     def get(self, request, *args, **kwargs) -> HttpResponse | HttpResponseRedirect:
         try:
@@ -52,13 +136,71 @@ class DetailView(generic.DetailView):
             return redirect(reverse('polls:index'))
 
 
-class ResultsView(generic.DetailView):
+class ResultsView(generic.TemplateView):
     """
     View for displaying the results of a poll question.
+    Renders only from the cached results snapshot and vote trend, so
+    repeated hits do not query the database. Final results are rendered
+    from the snapshot alone and may be cached by clients.
     """
-    model = Question
     template_name = 'polls/results.html'
 
+    def get(self, request, *args, **kwargs) -> HttpResponse:
+        response = super().get(request, *args, **kwargs)
+        if response.context_data['results']['final']:
+            patch_final_results_headers(response, public=not request.user.is_authenticated)
+        return response
+
+    def get_context_data(self, **kwargs) -> dict:
+        context = super().get_context_data(**kwargs)
+        try:
+            snapshot = get_results_snapshot(self.kwargs['pk'])
+        except Question.DoesNotExist:
+            raise Http404("No question found matching the query")
+
+        context['question'] = Question(**snapshot['question'])
+        context['results'] = snapshot
+        context['trend'] = None if snapshot['final'] else get_vote_trend(self.kwargs['pk'])
+        return context
+
+
+async def results_stream(request: HttpRequest, pk: int) -> StreamingHttpResponse:
+    """
+    Stream live results of a poll question as Server-Sent Events.
+    Requires the ASGI entry point.
+    """
+    updates = get_broadcaster().subscribe(pk)
+    try:
+        first = await updates.__anext__()
+    except Question.DoesNotExist:
+        raise Http404("No question found matching the query")
+
+    async def events():
+        yield format_event(first)
+        async for payload in updates:
+            yield format_event(payload)
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@staff_member_required
+def export_question(request: HttpRequest, question_id: int) -> StreamingHttpResponse:
+    """
+    Stream a question's results and votes to staff as CSV, or as NDJSON
+    with "?format=ndjson".
+    """
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS or not Question.objects.filter(pk=question_id).exists():
+        raise Http404("No question found matching the query")
+
+    response = StreamingHttpResponse(iter_question_export(question_id, fmt),
+                                     content_type=EXPORT_CONTENT_TYPES[fmt])
+    response['Content-Disposition'] = f'attachment; filename="question-{question_id}.{fmt}"'
+    return response
+
 
 def sign_up(request) -> HttpResponse | HttpResponseRedirect:
     """
@@ -0,0 +1,131 @@
+"""
+Per-user vote maps.
+
+A user's vote map, {question_id: choice_id}, is loaded with one query,
+kept in Django's cache framework per user and memoized on the request, so
+the index, detail and vote views can tell what the user voted for without
+a query per question. A map is invalidated whenever one of the user's
+votes is written. When the vote store holds the votes itself (see
+polls/votestore.py), the maps are read from the store instead.
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpRequest
+
+from mysite.instrumentation import record_cache_access
+from mysite.routers import use_primary
+
+from .models import Vote
+from .votestore import get_vote_store
+
+
+def user_votes_cache_key(user_id: int) -> str:
+    """
+    Return the cache key of a user's vote map.
+    """
+    return f'polls:user-votes:{user_id}'
+
+
+@use_primary()
+def build_user_votes(user_id: int) -> dict:
+    """
+    Load a user's vote map from the primary database with a single query.
+
+    Args:
+        user_id (int): The primary key of the user.
+
+    Returns:
+        dict: The id of the chosen choice, keyed by question id.
+    """
+    return dict(Vote.objects.filter(user_id=user_id).values_list('question_id', 'choice_id'))
+
+
+def get_user_votes(user_id: int) -> dict:
+    """
+    Return a user's vote map from the vote store, or from the cache,
+    loading and caching it on a cache miss.
+    """
+    votes = get_vote_store().get_user_votes(user_id)
+    if votes is not None:
+        return votes
+    key = user_votes_cache_key(user_id)
+    votes = cache.get(key)
+    record_cache_access(votes is not None)
+    if votes is None:
+        votes = build_user_votes(user_id)
+        cache.set(key, votes, settings.USER_VOTES_CACHE_TIMEOUT)
+    return votes
+
+
+async def aget_user_votes(user_id: int) -> dict:
+    """
+    Async version of get_user_votes(), using the async cache API.
+    """
+    votes = get_vote_store().get_user_votes(user_id)
+    if votes is not None:
+        return votes
+    key = user_votes_cache_key(user_id)
+    votes = await cache.aget(key)
+    record_cache_access(votes is not None)
+    if votes is None:
+        votes = await sync_to_async(build_user_votes)(user_id)
+        await cache.aset(key, votes, settings.USER_VOTES_CACHE_TIMEOUT)
+    return votes
+
+
+def get_request_votes(request: HttpRequest) -> dict:
+    """
+    Return the vote map of the request's user, at most once per request.
+
+    Returns:
+        dict: The user's vote map, or an empty dict for anonymous users.
+    """
+    if not hasattr(request, '_user_votes'):
+        user = request.user
+        request._user_votes = get_user_votes(user.pk) if user.is_authenticated else {}
+    return request._user_votes
+
+
+async def aget_request_votes(request: HttpRequest) -> dict:
+    """
+    Async version of get_request_votes(). request.user must already be
+    loaded, e.g. with aget_request_user().
+    """
+    if not hasattr(request, '_user_votes'):
+        user = request.user
+        request._user_votes = await aget_user_votes(user.pk) if user.is_authenticated else {}
+    return request._user_votes
+
+
+def remember_user_vote(user_id: int, question_id: int, choice_id: int) -> None:
+    """
+    Record a vote in a user's cached vote map before it reaches the database,
+    as with queued vote ingestion. Does nothing if the map is not cached.
+    """
+    key = user_votes_cache_key(user_id)
+    votes = cache.get(key)
+    if votes is not None:
+        votes[question_id] = choice_id
+        cache.set(key, votes, settings.USER_VOTES_CACHE_TIMEOUT)
+
+
+def invalidate_user_votes(user_id: int) -> None:
+    """
+    Drop a user's cached vote map, right away and again once the current
+    transaction commits.
+    """
+    key = user_votes_cache_key(user_id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def invalidate_many_user_votes(user_ids) -> None:
+    """
+    Drop the cached vote maps of many users with one cache round trip, e.g.
+    after their votes were deleted in bulk. Unlike invalidate_user_votes()
+    nothing is deleted again on commit, so the maps should only lose votes
+    that cannot change anymore, such as those of closed polls.
+    """
+    cache.delete_many([user_votes_cache_key(user_id) for user_id in set(user_ids)])
@@ -0,0 +1,429 @@
+"""
+Pluggable vote stores.
+
+AuthorizedUser.submit_vote casts votes through the store selected by
+settings.VOTE_STORE, and the results snapshot and vote maps read through
+it:
+
+- 'orm' (ORMVoteStore, the default) writes every vote to the Vote table,
+  directly or through the batching vote ingestor, and leaves the readers
+  on the database.
+- 'memory' (MemoryVoteStore) keeps the votes in a Redis-style key space,
+  a hash per question mapping each user to their choice, a hash of counts
+  per question and a hash per user mapping questions to choices. Votes
+  are answered from there right away, and a background worker flushes the
+  changed ones to the Vote table every VOTE_STORE_FLUSH_INTERVAL seconds.
+  The key space is rebuilt from the Vote table when the store starts.
+
+MemoryVoteStore talks to its client with Redis commands (HGET, HSET,
+HINCRBY, SADD, ...), so a redis-py client created with
+decode_responses=True can be passed in; by default it uses
+InMemoryRedis, an in-process implementation of those commands.
+"""
+import atexit
+import logging
+import threading
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.exceptions import ImproperlyConfigured
+from django.db import close_old_connections
+
+from .fragments import bump_question_version
+from .models import Choice, Question, Vote
+from .results import invalidate_results_snapshot
+
+logger = logging.getLogger(__name__)
+
+
+class InMemoryRedis:
+    """
+    The subset of Redis commands used by MemoryVoteStore, kept in process
+    memory. Values are returned as strings, as by a redis-py client created
+    with decode_responses=True.
+    """
+    def __init__(self) -> None:
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def exists(self, *names: str) -> int:
+        with self._lock:
+            return sum(name in self._data for name in names)
+
+    def delete(self, *names: str) -> int:
+        with self._lock:
+            return sum(self._data.pop(name, None) is not None for name in names)
+
+    def set(self, name: str, value) -> bool:
+        with self._lock:
+            self._data[name] = str(value)
+            return True
+
+    def get(self, name: str):
+        with self._lock:
+            return self._data.get(name)
+
+    def hget(self, name: str, key):
+        with self._lock:
+            return self._data.get(name, {}).get(str(key))
+
+    def hset(self, name: str, key, value) -> int:
+        with self._lock:
+            fields = self._data.setdefault(name, {})
+            created = str(key) not in fields
+            fields[str(key)] = str(value)
+            return int(created)
+
+    def hdel(self, name: str, *keys) -> int:
+        with self._lock:
+            fields = self._data.get(name, {})
+            return sum(fields.pop(str(key), None) is not None for key in keys)
+
+    def hgetall(self, name: str) -> dict:
+        with self._lock:
+            return dict(self._data.get(name, {}))
+
+    def hincrby(self, name: str, key, amount: int = 1) -> int:
+        with self._lock:
+            fields = self._data.setdefault(name, {})
+            value = int(fields.get(str(key), 0)) + amount
+            fields[str(key)] = str(value)
+            return value
+
+    def sadd(self, name: str, *values) -> int:
+        with self._lock:
+            members = self._data.setdefault(name, set())
+            added = {str(value) for value in values} - members
+            members.update(added)
+            return len(added)
+
+    def srem(self, name: str, *values) -> int:
+        with self._lock:
+            members = self._data.get(name, set())
+            removed = {str(value) for value in values} & members
+            members.difference_update(removed)
+            return len(removed)
+
+    def smembers(self, name: str) -> set:
+        with self._lock:
+            return set(self._data.get(name, set()))
+
+    def flushdb(self) -> bool:
+        with self._lock:
+            self._data.clear()
+            return True
+
+
+class VoteStore:
+    """
+    Base class of vote stores.
+
+    Readers call get_counts() and get_user_votes(); a None result means
+    the database is authoritative and should be read instead.
+    """
+    def cast(self, user: User, question: Question, choice: Choice) -> None:
+        """
+        Record a user's vote, replacing any earlier vote on the question.
+
+        Args:
+            user (User): The voting user.
+            question (Question): The question voted on.
+            choice (Choice): The chosen choice, already validated.
+        """
+        raise NotImplementedError
+
+    async def acast(self, user: User, question: Question, choice: Choice) -> None:
+        """
+        Async version of cast().
+        """
+        await sync_to_async(self.cast)(user, question, choice)
+
+    def absorb(self, user_id: int, question_id: int, choice_id: int) -> None:
+        """
+        Take in a vote that was saved to the database without going
+        through the store, e.g. from the admin.
+        """
+
+    def discard(self, user_id: int, question_id: int) -> None:
+        """
+        Forget a vote that was deleted from the database.
+        """
+
+    def get_counts(self, question_id: int):
+        """
+        Return the vote count of each choice of a question, keyed by choice
+        id, or None to read the counters in the database.
+        """
+        return None
+
+    def get_user_votes(self, user_id: int):
+        """
+        Return a user's vote map, {question_id: choice_id}, or None to read
+        it from the database.
+        """
+        return None
+
+
+class ORMVoteStore(VoteStore):
+    """
+    Write votes to the Vote table, with one upsert per vote or through the
+    vote ingestor when settings.VOTE_INGEST_MODE is 'queued'.
+    """
+    def cast(self, user: User, question: Question, choice: Choice) -> None:
+        if settings.VOTE_INGEST_MODE == 'queued':
+            from .ingest import get_vote_ingestor
+            from .votemap import remember_user_vote
+            get_vote_ingestor().submit(user.pk, question.pk, choice.pk)
+            remember_user_vote(user.pk, question.pk, choice.pk)
+        else:
+            Vote.objects.update_or_create(user=user, question=question,
+                                          defaults={'choice': choice})
+
+    async def acast(self, user: User, question: Question, choice: Choice) -> None:
+        if settings.VOTE_INGEST_MODE == 'queued':
+            await super().acast(user, question, choice)
+        else:
+            await Vote.objects.aupdate_or_create(user=user, question=question,
+                                                 defaults={'choice': choice})
+
+
+class MemoryVoteStore(VoteStore):
+    """
+    Hold the votes in a Redis-style key space and flush them to the Vote
+    table in the background.
+
+    Casting a vote updates the question's user->choice hash, its counts
+    hash and the user's question->choice hash under a process-wide lock,
+    and marks the vote dirty. flush() writes the current choice of every
+    dirty vote with ingest.write_votes(), which keeps the counters, the
+    vote events and the caches in step with the database. With a shared
+    Redis server and several processes the three updates of a vote would
+    need to run as one Lua script instead.
+    """
+    PREFIX = 'polls:vote-store'
+
+    def __init__(self, client=None, flush_interval: float = 1.0,
+                 batch_size: int = 500) -> None:
+        self.client = client if client is not None else InMemoryRedis()
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._worker = None
+
+    def key(self, *parts) -> str:
+        """
+        Return the key of one of the store's hashes or sets.
+        """
+        return ':'.join([self.PREFIX, *map(str, parts)])
+
+    def cast(self, user: User, question: Question, choice: Choice) -> None:
+        self.record(user.pk, question.pk, choice.pk)
+        invalidate_results_snapshot(question.pk)
+        bump_question_version(question.pk)
+
+    def record(self, user_id: int, question_id: int, choice_id: int,
+               dirty: bool = True) -> None:
+        """
+        Apply a vote to the key space.
+
+        Args:
+            user_id (int): The voting user.
+            question_id (int): The question voted on.
+            choice_id (int): The chosen choice.
+            dirty (bool): Mark the vote for the next flush.
+        """
+        votes = self.key('votes', question_id)
+        counts = self.key('counts', question_id)
+        with self._lock:
+            old = self.client.hget(votes, user_id)
+            if old == str(choice_id):
+                return
+            self.client.hset(votes, user_id, choice_id)
+            self.client.hset(self.key('user', user_id), question_id, choice_id)
+            self.client.hincrby(counts, choice_id, 1)
+            if old is not None:
+                self.client.hincrby(counts, old, -1)
+            if dirty:
+                self.client.sadd(self.key('dirty'), f'{user_id}:{question_id}')
+
+    def absorb(self, user_id: int, question_id: int, choice_id: int) -> None:
+        self.record(user_id, question_id, choice_id, dirty=False)
+
+    def discard(self, user_id: int, question_id: int) -> None:
+        votes = self.key('votes', question_id)
+        with self._lock:
+            old = self.client.hget(votes, user_id)
+            if old is None:
+                return
+            self.client.hdel(votes, user_id)
+            self.client.hdel(self.key('user', user_id), question_id)
+            self.client.hincrby(self.key('counts', question_id), old, -1)
+            self.client.srem(self.key('dirty'), f'{user_id}:{question_id}')
+
+    def get_counts(self, question_id: int) -> dict:
+        return {int(choice_id): int(count)
+                for choice_id, count in self.client.hgetall(self.key('counts', question_id)).items()}
+
+    def get_user_votes(self, user_id: int) -> dict:
+        return {int(question_id): int(choice_id)
+                for question_id, choice_id in self.client.hgetall(self.key('user', user_id)).items()}
+
+    def rebuild(self) -> int:
+        """
+        Reload the key space from the Vote table, after flushing any dirty
+        votes, dropping the votes of every question and user found there
+        first.
+
+        Returns:
+            int: The number of votes loaded.
+        """
+        self.flush()
+        with self._flush_lock:
+            rows = list(Vote.objects.values_list('user_id', 'question_id', 'choice_id'))
+            stale = set()
+            for user_id, question_id, _ in rows:
+                stale.update([self.key('votes', question_id), self.key('counts', question_id),
+                              self.key('user', user_id)])
+            if stale:
+                self.client.delete(*stale)
+            for user_id, question_id, choice_id in rows:
+                self.record(user_id, question_id, choice_id, dirty=False)
+            self.client.set(self.key('loaded'), 1)
+            return len(rows)
+
+    def load(self) -> None:
+        """
+        Rebuild the key space from the Vote table unless it is already
+        loaded, e.g. by another process sharing a Redis server.
+        """
+        if not self.client.exists(self.key('loaded')):
+            self.rebuild()
+
+    def flush(self) -> int:
+        """
+        Write the current choice of every dirty vote to the Vote table.
+        Votes whose choice or user is gone are dropped, and votes that fail
+        to be written otherwise stay dirty for the next flush.
+
+        Returns:
+            int: The number of votes created or changed.
+        """
+        from .ingest import write_votes
+
+        with self._flush_lock:
+            dirty_key = self.key('dirty')
+            members = sorted(self.client.smembers(dirty_key))
+            if not members:
+                return 0
+            self.client.srem(dirty_key, *members)
+            votes = []
+            for member in members:
+                user_id, question_id = map(int, member.split(':'))
+                choice_id = self.client.hget(self.key('votes', question_id), user_id)
+                if choice_id is not None:
+                    votes.append((user_id, question_id, int(choice_id)))
+            written = 0
+            try:
+                for start in range(0, len(votes), self.batch_size):
+                    batch = self.drop_orphans(votes[start:start + self.batch_size])
+                    written += write_votes(batch)
+            except Exception:
+                self.client.sadd(dirty_key, *members)
+                raise
+            return written
+
+    def drop_orphans(self, votes: list) -> list:
+        """
+        Forget the votes whose choice or user was deleted before they could
+        be flushed, so they cannot fail the batch they are written in.
+
+        Args:
+            votes (list): (user_id, question_id, choice_id) tuples.
+
+        Returns:
+            list: The votes whose choice and user still exist.
+        """
+        choice_ids = set(Choice.objects.filter(
+            pk__in={choice_id for _, _, choice_id in votes}).values_list('pk', flat=True))
+        user_ids = set(User.objects.filter(
+            pk__in={user_id for user_id, _, _ in votes}).values_list('pk', flat=True))
+        kept = []
+        for user_id, question_id, choice_id in votes:
+            if choice_id in choice_ids and user_id in user_ids:
+                kept.append((user_id, question_id, choice_id))
+                continue
+            self.discard(user_id, question_id)
+            invalidate_results_snapshot(question_id)
+            bump_question_version(question_id)
+        return kept
+
+    def start(self) -> None:
+        """
+        Start the background flush worker if it is not running yet.
+        """
+        if self._worker is None or not self._worker.is_alive():
+            self._stopped.clear()
+            self._worker = threading.Thread(target=self._run, name='vote-store-flusher',
+                                            daemon=True)
+            self._worker.start()
+
+    def stop(self) -> None:
+        """
+        Stop the background worker and flush the remaining dirty votes.
+        """
+        self._stopped.set()
+        if self._worker is not None:
+            self._worker.join()
+            self._worker = None
+        self.flush()
+
+    def _run(self) -> None:
+        """
+        Flush the dirty votes every flush interval.
+        """
+        while not self._stopped.is_set():
+            self._stopped.wait(self.flush_interval)
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Failed to flush the vote store")
+            finally:
+                close_old_connections()
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def create_vote_store(name: str) -> VoteStore:
+    """
+    Create the vote store for a settings.VOTE_STORE value, loading and
+    starting it if it keeps votes outside the database.
+
+    Raises:
+        ImproperlyConfigured: If the name is not a known vote store.
+    """
+    if name == 'orm':
+        return ORMVoteStore()
+    if name == 'memory':
+        store = MemoryVoteStore(flush_interval=settings.VOTE_STORE_FLUSH_INTERVAL,
+                                batch_size=settings.VOTE_INGEST_BATCH_SIZE)
+        store.load()
+        store.start()
+        atexit.register(store.stop)
+        return store
+    raise ImproperlyConfigured(f"Unknown VOTE_STORE: {name!r}")
+
+
+def get_vote_store() -> VoteStore:
+    """
+    Return the process-wide vote store selected by settings.VOTE_STORE.
+    """
+    name = settings.VOTE_STORE
+    with _stores_lock:
+        if name not in _stores:
+            _stores[name] = create_vote_store(name)
+        return _stores[name]